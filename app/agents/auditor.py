@@ -1,80 +1,263 @@
+import asyncio
 import json
+from typing import Dict, List, Optional, Tuple
 from langchain_core.prompts import ChatPromptTemplate
 from app.agents.utils import get_llm
-from app.models import ContractState
-from app.config import settings
+from app.agents.json_stream import ItemStream
+from app.agents.playbook import playbook_registry
+from app.agents.clause_cache import clause_cache, normalize_clause
+from app.models import ContractState, ExtractedClause, Risk
+from app import metrics
 
-def audit_risks(state: ContractState) -> ContractState:
-    """Agent 2: Audits extracted clauses against risk standards."""
+# Probability-style weights: each risk removes a share of the remaining "safety"
+RISK_LEVEL_WEIGHTS = {"high": 0.5, "medium": 0.25, "low": 0.1}
+
+prompt = ChatPromptTemplate.from_messages([
+    ("system", """You are a Senior Contract Lawyer. Your task is to audit the provided contract clauses against a "Risk Playbook".
+    
+    RISK PLAYBOOK:
+    {playbook_str}
     
+    TASK:
+    For each clause extracted, identify if it contains "Toxic" language, misses required protections, or presents a risk level (High/Medium/Low) based on the playbook.
+    
+    For each risk found, provide:
+    - "clause_id": The "id" of the clause the risk comes from.
+    - "clause_type": The category.
+    - "risk_level": High, Medium, or Low.
+    - "issue": A brief description of the risk.
+    - "toxic_language": The specific phrase that is problematic.
+    - "suggested_alternative": A legally sound, balanced alternative clause that protects our interest.
+    - "recommendation": Actionable advice for the client.
+    
+    Respond ONLY with a JSON object:
+    {{
+        "risks": [{{...}}, {{...}}]
+    }}
+    {critic_context}
+    """),
+    ("human", "Extracted Clauses:\n\n{clauses_str}")
+])
+
+def compute_risk_score(risks: List[Risk], category_weights: Optional[Dict[str, float]] = None) -> int:
+    """
+    Deterministic 0-100 score from the individual risk levels, each scaled by
+    its category's playbook weight (1.0 for categories the playbook doesn't weight).
+    """
+    weights = category_weights or {}
+    safety = 1.0
+    for risk in risks:
+        level_weight = RISK_LEVEL_WEIGHTS.get(str(risk.get("risk_level", "")).lower(), 0.0)
+        category_weight = weights.get(str(risk.get("clause_type", "")).strip().lower(), 1.0)
+        safety *= 1.0 - min(level_weight * category_weight, 1.0)
+    return round(100 * (1.0 - safety))
+
+async def _run_audit(clauses: List[Tuple[int, ExtractedClause]], critic_context: str) -> List[Risk]:
+    """
+    Audits (clause_id, clause) pairs against the matching playbook categories.
+    Findings are cached per clause only when the reply was well-formed and every item parsed.
+    """
     llm = get_llm(temperature=0.1)
+    chain = prompt | llm
     
-    # Load risk standards
-    try:
-        with open(settings.RISK_PLAYBOOK_PATH, "r") as f:
-            risk_playbook = json.load(f)
-    except Exception as e:
-        print(f"Error loading risk playbook: {e}")
-        risk_playbook = {"risk_categories": []}
-        
-    playbook_str = json.dumps(risk_playbook, indent=2)
-    clauses_str = json.dumps(state["clauses"], indent=2)
+    # Only the playbook categories matching the extracted clause types go into the prompt
+    playbook_str = playbook_registry.get().render(clause["type"] for _, clause in clauses)
+    clauses_str = json.dumps([{"id": i, **clause} for i, clause in clauses], indent=2)
+    
+    # Risks are parsed one by one as they stream in, so one bad item doesn't sink the rest
+    stream = ItemStream(chain, {
+        "playbook_str": playbook_str,
+        "clauses_str": clauses_str,
+        "critic_context": critic_context
+    }, agent="audit_risks", item="a risk finding", key="risks")
+    risks = [risk async for risk in stream]
+    if not stream.parser.started:
+        raise ValueError("Audit reply contained no JSON")
+    if stream.complete:
+        _remember(clauses, risks, playbook_registry.get().version)
+    return risks
+
+def finding_key(clause: ExtractedClause) -> str:
+    """Identifies a clause's findings across extraction chunks and merging."""
+    return f"{(clause.get('type') or '').strip().lower()}:{normalize_clause(clause.get('text', ''))}"
+
+class AuditPrefetcher:
+    """
+    Audits clauses in small batches while extraction is still streaming them in,
+    so the first audit pass mostly finds its work already done.
+    With `per_category`, each batch holds one clause category, so it is audited
+    against only that category's playbook entry, as the fan-out would.
+    """
+
+    def __init__(self, batch_size: int, per_category: bool = False):
+        self.batch_size = batch_size
+        self.per_category = per_category
+        self.playbook_version = playbook_registry.get().version
+        self.findings: Dict[str, List[Risk]] = {}
+        self._pending: Dict[str, List[ExtractedClause]] = {}
+        self._queued = set()
+        self._tasks: List[asyncio.Task] = []
+
+    def add(self, clause: ExtractedClause) -> None:
+        key = finding_key(clause)
+        if key in self._queued or not clause.get("text"):
+            return
+        self._queued.add(key)
+        cached = clause_cache.lookup(clause, self.playbook_version) if clause_cache else None
+        if cached is not None:
+            self.findings[key] = cached
+            return
+        group = (clause.get("type") or "").strip().lower() if self.per_category else ""
+        pending = self._pending.setdefault(group, [])
+        pending.append(dict(clause))
+        if len(pending) >= self.batch_size:
+            self._flush(group)
+
+    def _flush(self, group: str) -> None:
+        batch = self._pending.pop(group, None)
+        if batch:
+            self._tasks.append(asyncio.create_task(self._audit(batch)))
+
+    async def _audit(self, batch: List[ExtractedClause]) -> None:
+        targets = list(enumerate(batch))
+        with metrics.span("audit_prefetch"):
+            risks = await _run_audit(targets, "")
+        if any(risk.get("clause_id") not in range(len(batch)) for risk in risks):
+            # Can't attribute every finding, so leave these clauses to the audit node
+            return
+        for i, clause in targets:
+            self.findings[finding_key(clause)] = [
+                {k: v for k, v in risk.items() if k != "clause_id"} for risk in risks if risk.get("clause_id") == i
+            ]
+
+    def cancel(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+    async def finish(self) -> Dict[str, List[Risk]]:
+        """Waits for every batch; clauses whose batch failed are simply audited later."""
+        for group in list(self._pending):
+            self._flush(group)
+        for result in await asyncio.gather(*self._tasks, return_exceptions=True):
+            if isinstance(result, Exception):
+                print(f"Pipelined audit batch failed: {result}")
+        return self.findings
+
+def _recheck_targets(state: ContractState) -> Tuple[List[int], List[Risk]]:
+    """
+    Clause ids the critic wants re-audited and the risks that survive untouched.
+    A rejected risk sends its whole clause back, so every finding on that clause is redone.
+    """
+    rejected = set(state.get("rejected_risks") or [])
+    clause_ids = set(state.get("recheck_clauses") or [])
+    for i, risk in enumerate(state["risks"]):
+        if i in rejected:
+            if isinstance(risk.get("clause_id"), int):
+                clause_ids.add(risk["clause_id"])
+            else:
+                # Older findings without a clause_id: fall back to every clause of that type
+                clause_ids.update(j for j, c in enumerate(state["clauses"]) if c.get("type") == risk.get("clause_type"))
+    clause_ids = {i for i in clause_ids if 0 <= i < len(state["clauses"])}
+    kept = [
+        risk for i, risk in enumerate(state["risks"])
+        if i not in rejected and risk.get("clause_id") not in clause_ids
+    ]
+    return sorted(clause_ids), kept
+
+def _cached_findings(clauses: List[Tuple[int, ExtractedClause]], playbook_version: str, prefetched: Dict[str, List[Risk]]) -> Tuple[List[Risk], List[Tuple[int, ExtractedClause]]]:
+    """
+    Splits (clause_id, clause) pairs into findings already known (audited while
+    extraction streamed, or cached) and clauses still to audit.
+    """
+    reused, targets = [], []
+    for i, clause in clauses:
+        found = prefetched.get(finding_key(clause))
+        if found is None and clause_cache:
+            found = clause_cache.lookup(clause, playbook_version)
+        if found is None:
+            targets.append((i, clause))
+        else:
+            reused.extend({**risk, "clause_id": i} for risk in found)
+    return reused, targets
+
+def _remember(targets: List[Tuple[int, ExtractedClause]], risks: List[Risk], playbook_version: str) -> None:
+    """Caches fresh findings per clause, including "no risk" results."""
+    if not clause_cache:
+        return
+    target_ids = {i for i, _ in targets}
+    if any(risk.get("clause_id") not in target_ids for risk in risks):
+        # Findings we can't attribute to a clause would poison the cache
+        return
+    for i, clause in targets:
+        clause_cache.store(clause, playbook_version, [risk for risk in risks if risk.get("clause_id") == i])
+
+def category_groups(clauses: List[ExtractedClause]) -> Dict[str, List[int]]:
+    """Clause ids per clause category, in document order."""
+    groups: Dict[str, List[int]] = {}
+    for i, clause in enumerate(clauses):
+        groups.setdefault((clause.get("type") or "").strip().lower(), []).append(i)
+    return groups
+
+async def audit_category(task: dict) -> dict:
+    """
+    Fan-out worker: audits the clauses of one category against only that
+    category's playbook entry. A failed reply costs this category's findings only.
+    """
+    pairs = [(i, task["clauses"][i]) for i in task["clause_ids"]]
+    risks, targets = _cached_findings(pairs, playbook_registry.get().version, task.get("prefetched_risks") or {})
+    if targets:
+        try:
+            risks += await _run_audit(targets, "")
+        except ValueError as e:
+            print(f"Error parsing audit results for {task['category'] or 'uncategorized'} clauses: {e}")
+    return {"category_findings": {task["category"]: risks}}
+
+def _sorted_risks(risks: List[Risk], clause_count: int) -> List[Risk]:
+    # Keep findings in document order so the report reads the same after a re-audit
+    return sorted(risks, key=lambda r: r.get("clause_id") if isinstance(r.get("clause_id"), int) else clause_count)
+
+async def audit_risks(state: ContractState) -> ContractState:
+    """Agent 2: Audits extracted clauses against risk standards."""
+    
+    playbook = playbook_registry.get()
+    clause_ids, kept_risks = _recheck_targets(state)
+    rechecking = state.get("loop_count", 0) > 0
+    
+    if state.get("loop_count", 0) == 0 and state.get("category_findings"):
+        # First pass already ran per category in parallel; just merge
+        merged = [risk for risks in state["category_findings"].values() for risk in risks]
+        state["risks"] = _sorted_risks(merged, len(state["clauses"]))
+        state["risk_score"] = compute_risk_score(state["risks"], playbook.weights)
+        return state
     
     # Check if we have critic feedback (from a loop)
     critic_context = ""
     if state.get("critic_feedback"):
         critic_context = f"\n\nCRITIC FEEDBACK FROM PREVIOUS PASS:\n{state['critic_feedback']}\nPlease address this feedback in your updated audit."
-
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are a Senior Contract Lawyer. Your task is to audit the provided contract clauses against a "Risk Playbook".
-        
-        RISK PLAYBOOK:
-        {playbook_str}
-        
-        TASK:
-        For each clause extracted, identify if it contains "Toxic" language, misses required protections, or presents a risk level (High/Medium/Low) based on the playbook.
-        
-        For each risk found, provide:
-        - "clause_type": The category.
-        - "risk_level": High, Medium, or Low.
-        - "issue": A brief description of the risk.
-        - "toxic_language": The specific phrase that is problematic.
-        - "suggested_alternative": A legally sound, balanced alternative clause that protects our interest.
-        - "recommendation": Actionable advice for the client.
-        
-        Also, compute an overall "risk_score" from 0-100 (100 being extremely risky).
-        
-        Respond ONLY with a JSON object:
-        {{
-            "risks": [{{...}}, {{...}}],
-            "risk_score": 85
-        }}
-        {critic_context}
-        """),
-        ("human", "Extracted Clauses:\n\n{clauses_str}")
-    ])
     
-    chain = prompt | llm
+    if rechecking:
+        if not clause_ids:
+            # Rejection without structured ids: redo every clause
+            clause_ids, kept_risks = list(range(len(state["clauses"]))), []
+        # Re-audit the flagged clauses with the LLM (never from a cache), showing the findings being replaced
+        previous = [risk for risk in state["risks"] if risk not in kept_risks]
+        critic_context += f"\n\nPREVIOUS FINDINGS FOR THESE CLAUSES:\n{json.dumps(previous, indent=2)}"
+        targets = [(i, state["clauses"][i]) for i in clause_ids]
+    else:
+        # Clauses audited while extraction streamed, and boilerplate seen before, reuse their findings
+        kept_risks, targets = _cached_findings(list(enumerate(state["clauses"])), playbook.version, state.get("prefetched_risks") or {})
     
-    response = chain.invoke({
-        "playbook_str": playbook_str,
-        "clauses_str": clauses_str,
-        "critic_context": critic_context
-    })
+    risks = []
+    if targets:
+        try:
+            risks = await _run_audit(targets, critic_context)
+        except ValueError as e:
+            print(f"Error parsing audit results: {e}")
+            if rechecking:
+                # Keep the previous pass rather than discarding every finding
+                return state
     
-    content = response.content
-    if "```json" in content:
-        content = content.split("```json")[1].split("```")[0].strip()
-    elif "```" in content:
-        content = content.split("```")[1].split("```")[0].strip()
-        
-    try:
-        audit_results = json.loads(content)
-        state["risks"] = audit_results.get("risks", [])
-        state["risk_score"] = audit_results.get("risk_score", 0)
-    except Exception as e:
-        print(f"Error parsing audit results: {e}")
-        state["risks"] = []
-        state["risk_score"] = 0
+    state["risks"] = _sorted_risks(kept_risks + risks, len(state["clauses"]))
+    state["risk_score"] = compute_risk_score(state["risks"], playbook.weights)
         
     return state
@@ -0,0 +1,361 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from app.config import settings
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver):
+    """
+    LangGraph checkpointer on SQLite (WAL), shared by every worker process on the host.
+    Threads are audit jobs: the graph runs with thread_id = job_id, so a job that failed
+    or lost its worker resumes from its last completed node instead of starting over.
+    Channel values are stored once per version, as the in-memory saver does.
+    The `runs` table records which worker process is running each job's thread
+    (owner 0: not running, e.g. the job failed and is waiting for a resume).
+    Threads nobody has run for `ttl` seconds are pruned whenever a run is claimed.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        super().__init__()
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._running = set()  # threads this process is running
+        self._adopted = set()  # orphaned threads this process has taken over and queued to resume
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                parent_id TEXT,
+                type TEXT NOT NULL,
+                checkpoint BLOB NOT NULL,
+                metadata_type TEXT NOT NULL,
+                metadata BLOB NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                version TEXT NOT NULL,
+                type TEXT NOT NULL,
+                value BLOB,
+                PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+            );
+            CREATE TABLE IF NOT EXISTS writes (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                channel TEXT NOT NULL,
+                type TEXT NOT NULL,
+                value BLOB,
+                task_path TEXT NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+            );
+            CREATE TABLE IF NOT EXISTS runs (
+                thread_id TEXT PRIMARY KEY,
+                owner INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            );"""
+        )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; async methods run the sync ones in worker threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- BaseCheckpointSaver ---
+
+    def _tuple(self, thread_id: str, checkpoint_ns: str, row: tuple) -> CheckpointTuple:
+        checkpoint_id, parent_id, type_, blob, metadata_type, metadata = row
+        conn = self._conn()
+        checkpoint: Checkpoint = self.serde.loads_typed((type_, blob))
+        values = {}
+        for channel, version in checkpoint["channel_versions"].items():
+            found = conn.execute(
+                "SELECT type, value FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if found and found[0] != "empty":
+                values[channel] = self.serde.loads_typed(found)
+        writes = conn.execute(
+            "SELECT task_id, channel, type, value FROM writes"
+            " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+
+        def config(cid: str) -> RunnableConfig:
+            return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": cid}}
+
+        return CheckpointTuple(
+            config=config(checkpoint_id),
+            checkpoint={**checkpoint, "channel_values": values},
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=config(parent_id) if parent_id else None,
+            pending_writes=[(task_id, channel, self.serde.loads_typed((t, v))) for task_id, channel, t, v in writes],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata"
+        if checkpoint_id := get_checkpoint_id(config):
+            row = self._conn().execute(
+                f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            ).fetchone()
+        else:
+            row = self._conn().execute(
+                f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                (thread_id, checkpoint_ns),
+            ).fetchone()
+        return self._tuple(thread_id, checkpoint_ns, row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata FROM checkpoints"
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(config["configurable"]["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+        for thread_id, checkpoint_ns, *row in self._conn().execute(query, params).fetchall():
+            if limit is not None and limit <= 0:
+                break
+            found = self._tuple(thread_id, checkpoint_ns, tuple(row))
+            if filter and not all(found.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield found
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        stored = checkpoint.copy()
+        values = stored.pop("channel_values")
+        blobs = []
+        for channel, version in new_versions.items():
+            type_, value = self.serde.dumps_typed(values[channel]) if channel in values else ("empty", None)
+            blobs.append((thread_id, checkpoint_ns, channel, str(version), type_, value))
+        type_, blob = self.serde.dumps_typed(stored)
+        metadata_type, metadata_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        conn = self._conn()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", blobs)
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 type_, blob, metadata_type, metadata_blob),
+            )
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob = self.serde.dumps_typed(value)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx), channel, type_, blob, task_path))
+        # Special writes (errors, interrupts) replace; regular ones are written once per task
+        verb = "INSERT OR REPLACE" if all(w[0] in WRITES_IDX_MAP for w in writes) else "INSERT OR IGNORE"
+        conn = self._conn()
+        with conn:
+            conn.executemany(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def delete_thread(self, thread_id: str) -> None:
+        conn = self._conn()
+        with conn:
+            for table in ("checkpoints", "blobs", "writes", "runs"):
+                conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        found = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in found:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        # Off the event loop: the first checkpoint carries the whole document text
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    # --- Job ownership ---
+
+    def _owned(self, thread_id: str, owner: int) -> bool:
+        """
+        Whether `owner` (from the runs table) is a live worker running or about to resume the thread.
+        Our own pid on a thread we haven't taken was recycled from a dead worker.
+        """
+        mine = thread_id in self._running or thread_id in self._adopted
+        return bool(owner) and (mine or (owner != os.getpid() and _pid_alive(owner)))
+
+    def adopt(self, thread_id: str) -> bool:
+        """
+        Takes over a thread no live worker owns (failed or orphaned) before its resume is
+        queued, so only one worker ever queues it. Fails if there is no such thread or
+        another worker has it. The run itself still claims it when it starts.
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT owner FROM runs WHERE thread_id = ?", (thread_id,)).fetchone()
+            if row is None or self._owned(thread_id, row[0]):
+                return False
+            conn.execute("UPDATE runs SET owner = ?, updated_at = ? WHERE thread_id = ?", (os.getpid(), time.time(), thread_id))
+        self._adopted.add(thread_id)
+        return True
+
+    def claim(self, thread_id: str) -> bool:
+        """
+        Marks this worker process as running a job's thread. Fails if another
+        live worker already owns it, so a job is never resumed twice at once.
+        """
+        self.prune()
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT owner FROM runs WHERE thread_id = ?", (thread_id,)).fetchone()
+            if row and thread_id not in self._adopted and self._owned(thread_id, row[0]):
+                return False
+            conn.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?)", (thread_id, os.getpid(), time.time()))
+        self._adopted.discard(thread_id)
+        self._running.add(thread_id)
+        return True
+
+    def _forget(self, thread_id: str) -> None:
+        self._running.discard(thread_id)
+        self._adopted.discard(thread_id)
+
+    def release(self, thread_id: str) -> None:
+        """The run stopped without finishing; its checkpoints stay for a resume."""
+        self._forget(thread_id)
+        conn = self._conn()
+        with conn:
+            conn.execute("UPDATE runs SET owner = 0, updated_at = ? WHERE thread_id = ?", (time.time(), thread_id))
+
+    def detach(self, thread_id: str) -> None:
+        """
+        The run was interrupted by this worker shutting down. The thread keeps this
+        process as its owner, so the next worker to start finds it orphaned and resumes it.
+        """
+        self._forget(thread_id)
+
+    def finish(self, thread_id: str) -> None:
+        """The job completed or was cancelled; nothing left to resume."""
+        self._forget(thread_id)
+        self.delete_thread(thread_id)
+
+    def prune(self) -> int:
+        """
+        Deletes threads not updated for `ttl` seconds that no live worker is running,
+        i.e. failed or orphaned jobs nobody resumed, whose checkpoints hold the document text.
+        """
+        rows = self._conn().execute("SELECT thread_id, owner FROM runs WHERE updated_at < ?", (time.time() - self.ttl,)).fetchall()
+        stale = [thread_id for thread_id, owner in rows if not self._owned(thread_id, owner)]
+        for thread_id in stale:
+            self.delete_thread(thread_id)
+        return len(stale)
+
+    def orphaned(self) -> List[str]:
+        """
+        Threads whose owning worker died mid-run (killed on timeout, restarted,
+        or shut down while running), after pruning expired threads.
+        """
+        self.prune()
+        rows = self._conn().execute("SELECT thread_id, owner FROM runs WHERE owner != 0").fetchall()
+        return [thread_id for thread_id, owner in rows if not self._owned(thread_id, owner)]
+
+
+checkpointer = SQLiteCheckpointSaver(settings.CHECKPOINT_PATH, settings.JOB_TTL_SECONDS) if settings.CHECKPOINT_ENABLED else None
@@ -0,0 +1,108 @@
+import re
+from typing import List, Tuple
+from app.models import ExtractedClause
+
+# Lines that open a new section: "ARTICLE IV", "Section 12.3", "7.", "7.2 Termination", "SCHEDULE A", ...
+SECTION_HEADING = re.compile(
+    r"^\s*(?:"
+    r"(?:ARTICLE|Article|SECTION|Section|CLAUSE|Clause|SCHEDULE|Schedule|EXHIBIT|Exhibit)\s+[\dIVXLC]+[A-Za-z]?\b"
+    r"|\d+(?:\.\d+)*[.)]?\s+[A-Z]"
+    r"|[A-Z][A-Z \-&,]{3,60}$"
+    r")",
+    re.MULTILINE,
+)
+
+
+def section_bounds(text: str) -> List[Tuple[int, int]]:
+    """Character ranges of each section, each starting at its heading."""
+    starts = [m.start() for m in SECTION_HEADING.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    bounds = starts + [len(text)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def split_sections(text: str) -> List[str]:
+    """Splits contract text at section headings, keeping each heading with its body."""
+    return [text[a:b] for a, b in section_bounds(text) if text[a:b].strip()]
+
+
+def _split_oversized(section: str, max_chars: int) -> List[str]:
+    """Breaks a section larger than max_chars on paragraph, then line, boundaries."""
+    pieces, current = [], ""
+    for para in re.split(r"(\n\s*\n)", section):
+        while len(para) > max_chars:
+            cut = para.rfind("\n", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(para[:cut])
+            para = para[cut:]
+        if len(current) + len(para) > max_chars and current:
+            pieces.append(current)
+            current = ""
+        current += para
+    if current.strip():
+        pieces.append(current)
+    return pieces
+
+
+def chunk_text(text: str, max_chars: int, overlap_chars: int) -> List[str]:
+    """
+    Packs whole sections into chunks of at most max_chars.
+    Each chunk after the first is prefixed with the tail of the previous one,
+    so a clause straddling a boundary is fully visible in at least one chunk.
+    """
+    if len(text) <= max_chars:
+        return [text]
+
+    budget = max(max_chars - overlap_chars, max_chars // 2)
+    chunks, current = [], ""
+    for section in split_sections(text):
+        for piece in _split_oversized(section, budget):
+            if len(current) + len(piece) > budget and current:
+                chunks.append(current)
+                current = ""
+            current += piece
+    if current.strip():
+        chunks.append(current)
+
+    overlapped = chunks[:1]
+    for prev, chunk in zip(chunks, chunks[1:]):
+        overlapped.append(prev[-overlap_chars:] + chunk if overlap_chars else chunk)
+    return overlapped
+
+
+def _normalize(value: str) -> str:
+    return re.sub(r"\s+", " ", (value or "")).strip().lower()
+
+
+def merge_clauses(clause_lists: List[List[ExtractedClause]]) -> List[ExtractedClause]:
+    """
+    Merges per-chunk extractions in document order, dropping duplicates.
+    Two clauses of the same type and section are duplicates when one's text
+    contains the other's (overlap regions often yield a truncated copy);
+    the longer text is kept.
+    """
+    merged: List[ExtractedClause] = []
+    for clauses in clause_lists:
+        for clause in clauses:
+            ctype, section, text = _normalize(clause.get("type")), _normalize(clause.get("section")), _normalize(clause.get("text"))
+            if not text:
+                continue
+            for i, existing in enumerate(merged):
+                if _normalize(existing.get("type")) != ctype:
+                    continue
+                existing_section = _normalize(existing.get("section"))
+                if section and existing_section and section != existing_section:
+                    continue
+                existing_text = _normalize(existing.get("text"))
+                if text in existing_text:
+                    break
+                if existing_text in text:
+                    merged[i] = clause
+                    break
+            else:
+                merged.append(clause)
+    return merged
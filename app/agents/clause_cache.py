@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+from typing import Dict, List, Optional
+from app.config import settings
+from app.models import ExtractedClause, Risk
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+_PRIME = (1 << 61) - 1
+
+# Fixed (a, b) pairs so signatures stay comparable across restarts
+_PERMUTATIONS = [
+    (int.from_bytes(hashlib.sha256(f"a{i}".encode()).digest()[:8], "big") % _PRIME or 1,
+     int.from_bytes(hashlib.sha256(f"b{i}".encode()).digest()[:8], "big") % _PRIME)
+    for i in range(NUM_PERM)
+]
+
+
+def normalize_clause(text: str) -> str:
+    """Lower-cases and strips punctuation/whitespace differences that don't change meaning."""
+    return " ".join(re.sub(r"[^a-z0-9$%]+", " ", (text or "").lower()).split())
+
+
+def minhash(normalized: str) -> List[int]:
+    """MinHash signature over word shingles of a normalized clause."""
+    words = normalized.split()
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(len(words) - SHINGLE_WORDS + 1, 1))}
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") for s in shingles]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def similarity(sig_a: List[int], sig_b: List[int]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _band_keys(signature: List[int]) -> List[str]:
+    return [
+        hashlib.blake2b(struct.pack(f"{ROWS}Q", *signature[b * ROWS:(b + 1) * ROWS]), digest_size=8).hexdigest() + f":{b}"
+        for b in range(BANDS)
+    ]
+
+
+class ClauseCache:
+    """
+    Clause-level audit findings keyed on (playbook version, clause type, normalized text).
+    Exact repeats hit directly; lightly edited boilerplate is found through MinHash LSH
+    and reused when its estimated similarity reaches `threshold`.
+    """
+
+    def __init__(self, path: str, threshold: float, max_entries: int):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "near_hits": 0, "misses": 0}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """CREATE TABLE IF NOT EXISTS clause_entries (
+                id INTEGER PRIMARY KEY,
+                scope TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                risks TEXT NOT NULL,
+                last_accessed REAL NOT NULL,
+                UNIQUE (scope, text_hash)
+            );
+            CREATE TABLE IF NOT EXISTS clause_bands (
+                band_key TEXT NOT NULL,
+                entry_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_clause_bands ON clause_bands (band_key);
+            CREATE INDEX IF NOT EXISTS idx_clause_band_entries ON clause_bands (entry_id);
+            CREATE INDEX IF NOT EXISTS idx_clause_lru ON clause_entries (last_accessed);"""
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _scope(clause: ExtractedClause, playbook_version: str) -> str:
+        return f"{playbook_version}:{(clause.get('type') or '').strip().lower()}"
+
+    def lookup(self, clause: ExtractedClause, playbook_version: str) -> Optional[List[Risk]]:
+        """Cached findings for this clause (possibly an empty list), or None on a miss."""
+        normalized = normalize_clause(clause.get("text", ""))
+        if not normalized:
+            return None
+        scope = self._scope(clause, playbook_version)
+        text_hash = hashlib.sha256(normalized.encode()).hexdigest()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, risks FROM clause_entries WHERE scope = ? AND text_hash = ?", (scope, text_hash)
+            ).fetchone()
+            if row:
+                self._stats["exact_hits"] += 1
+                return self._hit(*row)
+
+            signature = minhash(normalized)
+            keys = _band_keys(signature)
+            candidates = self._conn.execute(
+                f"""SELECT DISTINCT e.id, e.signature, e.risks FROM clause_bands b
+                JOIN clause_entries e ON e.id = b.entry_id
+                WHERE e.scope = ? AND b.band_key IN ({",".join("?" * len(keys))})""",
+                (scope, *keys),
+            ).fetchall()
+            best = None
+            for entry_id, blob, risks in candidates:
+                score = similarity(signature, list(struct.unpack(f"{NUM_PERM}Q", blob)))
+                if score >= self.threshold and (best is None or score > best[0]):
+                    best = (score, entry_id, risks)
+            if best:
+                self._stats["near_hits"] += 1
+                return self._hit(best[1], best[2])
+            self._stats["misses"] += 1
+            return None
+
+    def _hit(self, entry_id: int, risks: str) -> List[Risk]:
+        self._conn.execute("UPDATE clause_entries SET last_accessed = ? WHERE id = ?", (time.time(), entry_id))
+        self._conn.commit()
+        return json.loads(risks)
+
+    def store(self, clause: ExtractedClause, playbook_version: str, risks: List[Risk]) -> None:
+        normalized = normalize_clause(clause.get("text", ""))
+        if not normalized:
+            return
+        signature = minhash(normalized)
+        # clause_id is positional within a single document, so it is never cached
+        payload = json.dumps([{k: v for k, v in risk.items() if k != "clause_id"} for risk in risks])
+        scope = self._scope(clause, playbook_version)
+        text_hash = hashlib.sha256(normalized.encode()).hexdigest()
+        with self._lock:
+            # Replace any earlier findings for the same text (e.g. after a critic rejection)
+            self._delete_where("scope = ? AND text_hash = ?", (scope, text_hash))
+            cursor = self._conn.execute(
+                """INSERT INTO clause_entries (scope, text_hash, signature, risks, last_accessed)
+                VALUES (?, ?, ?, ?, ?)""",
+                (
+                    scope,
+                    text_hash,
+                    struct.pack(f"{NUM_PERM}Q", *signature),
+                    payload,
+                    time.time(),
+                ),
+            )
+            self._conn.executemany(
+                "INSERT INTO clause_bands (band_key, entry_id) VALUES (?, ?)",
+                [(key, cursor.lastrowid) for key in _band_keys(signature)],
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _delete_where(self, condition: str, params: tuple) -> int:
+        ids = [row[0] for row in self._conn.execute(f"SELECT id FROM clause_entries WHERE {condition}", params)]
+        if ids:
+            marks = ",".join("?" * len(ids))
+            self._conn.execute(f"DELETE FROM clause_bands WHERE entry_id IN ({marks})", ids)
+            self._conn.execute(f"DELETE FROM clause_entries WHERE id IN ({marks})", ids)
+        return len(ids)
+
+    def _evict(self) -> None:
+        """Drops least-recently-used entries beyond max_entries."""
+        count = self._conn.execute("SELECT COUNT(*) FROM clause_entries").fetchone()[0]
+        if count > self.max_entries:
+            self._delete_where(
+                "id IN (SELECT id FROM clause_entries ORDER BY last_accessed ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def invalidate(self) -> int:
+        with self._lock:
+            self._conn.execute("DELETE FROM clause_bands")
+            cursor = self._conn.execute("DELETE FROM clause_entries")
+            self._conn.commit()
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM clause_entries").fetchone()[0]
+            stats = dict(self._stats)
+        lookups = stats["exact_hits"] + stats["near_hits"] + stats["misses"]
+        stats.update({
+            "entries": entries,
+            "threshold": self.threshold,
+            "hit_rate": round((stats["exact_hits"] + stats["near_hits"]) / lookups, 4) if lookups else 0.0,
+        })
+        return stats
+
+
+clause_cache = ClauseCache(
+    settings.CLAUSE_CACHE_PATH,
+    settings.CLAUSE_CACHE_SIMILARITY,
+    settings.CLAUSE_CACHE_MAX_ENTRIES,
+) if settings.CLAUSE_CACHE_ENABLED else None
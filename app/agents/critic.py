@@ -1,59 +1,135 @@
 import json
 from langchain_core.prompts import ChatPromptTemplate
-from app.agents.utils import get_llm
+from app.agents.utils import get_llm, ainvoke_chain
+from app.agents.json_stream import parse_json_reply
+from app.agents.playbook import playbook_registry
+from app.agents.precritic import check_audit
 from app.models import ContractState
+from app.config import settings
+from app import metrics
 
-def critique_audit(state: ContractState) -> ContractState:
+prompt = ChatPromptTemplate.from_messages([
+    ("system", """You are a Legal Critic. Your task is to review the "Risk Audit" performed by a colleague.
+    
+    EXTRACTED CLAUSES:
+    {clauses_str}
+    
+    RISK AUDIT TO REVIEW:
+    {risks_str}
+    
+    TASK:
+    Check for any of the following:
+    1. Hallucinations: Did the auditor claim a risk exists that isn't supported by the clause text?
+    2. Missed Risks: Did the auditor miss a glaring "Toxic" phrase from the playbook?
+    3. Incorrect Severity: Is a High risk labeled as Low, or vice-versa?
+    4. Poor Alternatives: Are the "Suggested Alternatives" actually safer/better?
+    
+    Give a verdict for every risk by its "id", and list the "id" of any clause with a missed risk.
+    
+    Respond ONLY with a JSON object:
+    {{
+        "critic_approved": true/false,
+        "feedback": "Details on what to fix, or 'Looks good' if approved.",
+        "risk_verdicts": [{{"id": 0, "approved": true/false, "reason": "..."}}],
+        "missed_clauses": [{{"id": 2, "reason": "..."}}]
+    }}
+    """),
+    ("human", "Please review the audit above.")
+])
+
+# Used when the rule checks flagged something: the model only sees the flagged items
+flagged_prompt = ChatPromptTemplate.from_messages([
+    ("system", """You are a Legal Critic. Automated checks flagged possible problems in a colleague's "Risk Audit".
+    
+    FLAGGED PROBLEMS:
+    {failures_str}
+    
+    CLAUSES INVOLVED:
+    {clauses_str}
+    
+    RISK AUDIT TO REVIEW (flagged risks only):
+    {risks_str}
+    
+    TASK:
+    Decide whether each flagged problem is real. A quote may be a fair paraphrase, and a severity
+    may differ from the playbook default for a good reason; a clause may contain a toxic phrase
+    in a harmless context. Reject a risk only if the problem is real, and list a clause as missed
+    only if it genuinely needs a risk raised.
+    
+    Respond ONLY with a JSON object:
+    {{
+        "critic_approved": true/false,
+        "feedback": "Details on what to fix, or 'Looks good' if approved.",
+        "risk_verdicts": [{{"id": 0, "approved": true/false, "reason": "..."}}],
+        "missed_clauses": [{{"id": 2, "reason": "..."}}]
+    }}
+    """),
+    ("human", "Please review the flagged problems above.")
+])
+
+def _flagged_inputs(state: ContractState, failures) -> dict:
+    """Prompt inputs restricted to the risks and clauses the rule checks flagged."""
+    risk_ids = sorted({f.risk_id for f in failures if f.risk_id is not None})
+    clause_ids = {f.clause_id for f in failures if f.clause_id is not None}
+    clause_ids |= {state["risks"][i].get("clause_id") for i in risk_ids}
+    clause_ids = sorted(i for i in clause_ids if isinstance(i, int) and 0 <= i < len(state["clauses"]))
+    failures_str = "\n".join(
+        f"- {f.kind}" + (f" (risk {f.risk_id})" if f.risk_id is not None else "") +
+        (f" (clause {f.clause_id})" if f.clause_id is not None else "") + f": {f.reason}"
+        for f in failures
+    )
+    return {
+        "failures_str": failures_str,
+        "clauses_str": json.dumps([{"id": i, **state["clauses"][i]} for i in clause_ids], indent=2),
+        "risks_str": json.dumps([{"id": i, **state["risks"][i]} for i in risk_ids], indent=2),
+    }
+
+async def critique_audit(state: ContractState) -> ContractState:
     """Agent 3: Critiques the Auditor's work to ensure accuracy and completeness."""
     
     # High temperature for adversarial thinking
     llm = get_llm(temperature=0.7)
     
-    clauses_str = json.dumps(state["clauses"], indent=2)
-    risks_str = json.dumps(state["risks"], indent=2)
+    if settings.CRITIC_RULES_FAST_PATH:
+        failures = check_audit(state["clauses"], state["risks"], playbook_registry.get())
+        metrics.critic_rule_checks.inc("flagged" if failures else "passed")
+        if not failures:
+            # Nothing a critic would catch deterministically; skip the round trip
+            state["critic_approved"] = True
+            state["rejected_risks"] = []
+            state["recheck_clauses"] = []
+            state["critic_feedback"] = "Looks good (rule checks passed)"
+            state["loop_count"] = state.get("loop_count", 0) + 1
+            return state
+        chain, inputs = flagged_prompt | llm, _flagged_inputs(state, failures)
+    else:
+        chain = prompt | llm
+        inputs = {
+            "clauses_str": json.dumps([{"id": i, **clause} for i, clause in enumerate(state["clauses"])], indent=2),
+            "risks_str": json.dumps([{"id": i, **risk} for i, risk in enumerate(state["risks"])], indent=2)
+        }
     
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are a Legal Critic. Your task is to review the "Risk Audit" performed by a colleague.
-        
-        EXTRACTED CLAUSES:
-        {clauses_str}
-        
-        RISK AUDIT TO REVIEW:
-        {risks_str}
-        
-        TASK:
-        Check for any of the following:
-        1. Hallucinations: Did the auditor claim a risk exists that isn't supported by the clause text?
-        2. Missed Risks: Did the auditor miss a glaring "Toxic" phrase from the playbook?
-        3. Incorrect Severity: Is a High risk labeled as Low, or vice-versa?
-        4. Poor Alternatives: Are the "Suggested Alternatives" actually safer/better?
-        
-        Respond ONLY with a JSON object:
-        {{
-            "critic_approved": true/false,
-            "feedback": "Details on what to fix, or 'Looks good' if approved."
-        }}
-        """),
-        ("human", "Please review the audit above.")
-    ])
+    response = await ainvoke_chain(chain, inputs)
     
-    chain = prompt | llm
-    
-    response = chain.invoke({
-        "clauses_str": clauses_str,
-        "risks_str": risks_str
-    })
-    
-    content = response.content
-    if "```json" in content:
-        content = content.split("```json")[1].split("```")[0].strip()
-    elif "```" in content:
-        content = content.split("```")[1].split("```")[0].strip()
-        
     try:
-        critic_results = json.loads(content)
+        critic_results = await parse_json_reply(response.content, "a JSON object with critic_approved, feedback, risk_verdicts and missed_clauses", "critique_audit")
         state["critic_approved"] = critic_results.get("critic_approved", False)
-        state["critic_feedback"] = critic_results.get("feedback", "")
+        
+        # Per-item verdicts let the auditor redo only what was rejected
+        rejected, recheck, notes = [], [], []
+        for verdict in critic_results.get("risk_verdicts", []):
+            if not verdict.get("approved", True) and isinstance(verdict.get("id"), int):
+                rejected.append(verdict["id"])
+                notes.append(f"- Risk {verdict['id']}: {verdict.get('reason', '')}")
+        for missed in critic_results.get("missed_clauses", []):
+            if isinstance(missed.get("id"), int):
+                recheck.append(missed["id"])
+                notes.append(f"- Clause {missed['id']}: {missed.get('reason', '')}")
+        
+        state["rejected_risks"] = rejected
+        state["recheck_clauses"] = recheck
+        feedback = critic_results.get("feedback", "")
+        state["critic_feedback"] = "\n".join([feedback] + notes) if notes else feedback
     except Exception as e:
         print(f"Error parsing critic results: {e}")
         state["critic_approved"] = True  # Safety to avoid infinite loops if parsing fails
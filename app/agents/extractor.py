@@ -1,48 +1,117 @@
-import json
+import asyncio
+from typing import Callable, List, Optional
 from langchain_core.prompts import ChatPromptTemplate
 from app.agents.utils import get_llm
-from app.models import ContractState
+from app.agents.json_stream import ItemStream
+from app.agents.auditor import AuditPrefetcher
+from app.agents.chunker import chunk_text, merge_clauses
+from app.agents.pattern_index import candidate_windows, locate_clause
+from app.agents.playbook import playbook_registry
+from app.agents.revision import carry_sections, carry_unchanged, diff_clauses, document_sections, previous_findings
+from app.pdf_processor import page_for_offset
+from app.models import ContractState, ExtractedClause
+from app.config import settings
 
-def extract_clauses(state: ContractState) -> ContractState:
-    """Agent 1: Extracts specific clauses from the document text."""
+prompt = ChatPromptTemplate.from_messages([
+    ("system", """You are a legal expert specializing in contract extraction. 
+    Your task is to identify and extract the following clause types from the provided contract text:
+    1. Indemnity
+    2. Termination
+    3. Governing Law
+    4. Limitation of Liability
+    5. Intellectual Property
+    
+    For each clause found, return a JSON object with:
+    - "type": The category of the clause.
+    - "text": The exact text of the clause.
+    - "section": The section number or title if available.
     
+    Respond ONLY with a JSON list of these objects. If a clause type is not found, do not include it.
+    """),
+    ("human", "Contract Text:\n\n{document_text}")
+])
+
+async def _extract_from_text(document_text: str, on_clause: Optional[Callable[[ExtractedClause], None]] = None) -> List[ExtractedClause]:
+    """
+    Runs one extraction call over a piece of contract text.
+    Clauses are parsed as they stream in and handed to `on_clause` as soon as each is complete.
+    """
     llm = get_llm(temperature=0.0)
+    chain = prompt | llm
+    
+    clauses = []
+    stream = ItemStream(chain, {"document_text": document_text}, agent="extract_clauses", item='a clause with "type", "text" and "section"')
+    async for clause in stream:
+        clauses.append(clause)
+        if on_clause:
+            on_clause(clause)
+    return clauses
+
+def _candidate_text(document_text: str, revision: bool = False) -> str:
+    """
+    Narrows the document to the passages the playbook pattern index flags.
+    Falls back to the full text when nothing matches or the passages cover most of it,
+    except for the changed text of a revision, where no match means nothing to extract.
+    """
+    if not settings.EXTRACTION_PREFILTER:
+        return document_text
+    hits = playbook_registry.get().pattern_index.find(document_text)
+    windows = candidate_windows(document_text, hits, settings.EXTRACTION_PREFILTER_WINDOW_CHARS)
+    if not windows and revision:
+        return ""
+    covered = sum(hi - lo for lo, hi in windows)
+    if not windows or covered > 0.8 * len(document_text):
+        return document_text
+    return "\n\n[...]\n\n".join(document_text[lo:hi] for lo, hi in windows)
+
+async def extract_clauses(state: ContractState) -> ContractState:
+    """Agent 1: Extracts specific clauses from the document text."""
     
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are a legal expert specializing in contract extraction. 
-        Your task is to identify and extract the following clause types from the provided contract text:
-        1. Indemnity
-        2. Termination
-        3. Governing Law
-        4. Limitation of Liability
-        5. Intellectual Property
-        
-        For each clause found, return a JSON object with:
-        - "type": The category of the clause.
-        - "text": The exact text of the clause.
-        - "section": The section number or title if available.
-        
-        Respond ONLY with a JSON list of these objects. If a clause type is not found, do not include it.
-        """),
-        ("human", "Contract Text:\n\n{document_text}")
-    ])
+    previous = state.get("previous_clauses") or []
+    carried, text = [], state["document_text"]
+    # Kept with the result, so a later version can tell which sections changed
+    state["sections"] = document_sections(text)
+    if previous and state.get("previous_sections"):
+        # Revision of an earlier upload: clauses of unchanged sections are reused,
+        # and only the sections whose text differs are extracted again
+        carried, text = carry_sections(text, state["sections"], previous, state["previous_sections"])
+    elif previous:
+        # Previous result from before section hashes were kept: reuse the clauses
+        # still there word for word and extract the text around them
+        carried, text = carry_unchanged(text, previous)
+    text = _candidate_text(text, revision=bool(previous))
+    chunks = chunk_text(text, settings.EXTRACTION_CHUNK_CHARS, settings.EXTRACTION_CHUNK_OVERLAP) if text.strip() else []
     
-    chain = prompt | llm
+    # Long contracts: extract section-aligned chunks concurrently, bounded fan-out
+    semaphore = asyncio.Semaphore(settings.EXTRACTION_MAX_CONCURRENCY)
+    # First-pass auditing starts on each clause as soon as it streams in; with the
+    # fan-out on, each batch stays within one category and gets only its playbook entry
+    prefetcher = AuditPrefetcher(settings.AUDIT_PIPELINE_BATCH_SIZE, per_category=settings.AUDIT_FAN_OUT) if settings.AUDIT_PIPELINE else None
     
-    response = chain.invoke({"document_text": state["document_text"]})
+    async def extract_chunk(chunk: str) -> List[ExtractedClause]:
+        async with semaphore:
+            return await _extract_from_text(chunk, prefetcher.add if prefetcher else None)
     
-    # Handle content parsing
-    content = response.content
-    if "```json" in content:
-        content = content.split("```json")[1].split("```")[0].strip()
-    elif "```" in content:
-        content = content.split("```")[1].split("```")[0].strip()
-        
     try:
-        clauses = json.loads(content)
-        state["clauses"] = clauses
-    except Exception as e:
-        print(f"Error parsing clauses: {e}")
-        state["clauses"] = []
-        
+        results = await asyncio.gather(*(extract_chunk(chunk) for chunk in chunks))
+    except BaseException:
+        if prefetcher:
+            prefetcher.cancel()
+        raise
+    clauses = merge_clauses([carried] + list(results))
+    for clause in clauses:
+        clause["offset"] = locate_clause(state["document_text"], clause.get("text", ""))
+        clause["page"] = page_for_offset(state.get("page_offsets", []), clause["offset"])
+    if previous:
+        clauses.sort(key=lambda c: c["offset"] if c["offset"] is not None else len(state["document_text"]))
+    state["clauses"] = clauses
+    state["prefetched_risks"] = await prefetcher.finish() if prefetcher else {}
+    if previous:
+        # Unchanged clauses take the previous version's findings instead of a new audit
+        state["prefetched_risks"] = {**previous_findings(previous, state.get("previous_risks") or []), **state["prefetched_risks"]}
+        state["revision"] = diff_clauses(previous, clauses, state.get("previous_risks") or [])
+    if settings.LOW_MEMORY_MODE:
+        # Nothing after extraction reads the full text
+        state["document_text"] = ""
+    
     return state
@@ -0,0 +1,180 @@
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from typing import Any, AsyncIterator, List, Optional
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from app.agents.chunker import section_bounds
+from app.agents.playbook import playbook_registry
+
+
+# Separate from the per-prompt RNG so a retried call can succeed
+_error_rng = random.Random(0)
+
+
+class FakeRateLimitError(Exception):
+    """Injected failure shaped like a provider 429, so retry/backoff paths get exercised."""
+    status_code = 429
+
+
+class FakeContractLLM(BaseChatModel):
+    """
+    Offline stand-in for a chat provider, for benchmarks and local runs.
+    Recognises which agent is calling from the system prompt and answers with
+    deterministic, schema-valid JSON derived from the input text and the playbook.
+    """
+
+    latency_ms: float = 200.0
+    jitter_ms: float = 50.0
+    error_rate: float = 0.0
+    seed: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-contract"
+
+    def _rng(self, messages: List[BaseMessage]) -> random.Random:
+        digest = hashlib.sha256("".join(str(m.content) for m in messages).encode()).digest()
+        return random.Random(int.from_bytes(digest[:8], "big") ^ self.seed)
+
+    def _delay(self, rng: random.Random) -> float:
+        return max(self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms), 0.0) / 1000
+
+    def _respond(self, messages: List[BaseMessage], rng: random.Random) -> ChatResult:
+        if _error_rng.random() < self.error_rate:
+            raise FakeRateLimitError("Error code: 429 - Rate limit reached. Please try again in 0.2s")
+
+        system = str(messages[0].content)
+        human = str(messages[-1].content)
+        if "fix malformed JSON" in system:
+            content = _fake_repair(human)
+        elif "contract extraction" in system:
+            content = json.dumps(_fake_extract(human.split("Contract Text:", 1)[-1]))
+        elif "Senior Contract Lawyer" in system:
+            content = "```json\n" + json.dumps(_fake_audit(human)) + "\n```"
+        else:
+            content = json.dumps(_fake_critique(system))
+
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+        completion_tokens = len(content) // 4
+        message = AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        rng = self._rng(messages)
+        time.sleep(self._delay(rng))
+        return self._respond(messages, rng)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        rng = self._rng(messages)
+        await asyncio.sleep(self._delay(rng))
+        return self._respond(messages, rng)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        """Streams the same reply in small pieces, spreading the latency across them."""
+        rng = self._rng(messages)
+        delay = self._delay(rng)
+        result = self._respond(messages, rng)
+        message = result.generations[0].message
+        pieces = [message.content[i:i + 40] for i in range(0, len(message.content), 40)] or [""]
+        for i, piece in enumerate(pieces):
+            await asyncio.sleep(delay / len(pieces))
+            last = i == len(pieces) - 1
+            chunk = AIMessageChunk(content=piece, usage_metadata=message.usage_metadata if last else None)
+            yield ChatGenerationChunk(message=chunk)
+
+
+def _fake_repair(fragment: str) -> str:
+    """Closes what a truncated fragment left open, dropping trailing fields until it parses."""
+    while fragment:
+        repaired = _close_json(fragment)
+        try:
+            json.loads(repaired)
+            return repaired
+        except json.JSONDecodeError:
+            fragment = fragment[:fragment.rfind(",")] if "," in fragment else ""
+    return "{}"
+
+
+def _close_json(fragment: str) -> str:
+    closers, in_string, escape = [], False, False
+    for ch in fragment:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "[{":
+            closers.append("]" if ch == "[" else "}")
+        elif ch in "]}" and closers:
+            closers.pop()
+    repaired = fragment.rstrip() + ('"' if in_string else "")
+    return repaired.rstrip(",") + "".join(reversed(closers))
+
+
+def _fake_extract(text: str) -> List[dict]:
+    """One clause per category: the section holding that category's first keyword or toxic hit."""
+    sections = section_bounds(text)
+    clauses, seen = [], set()
+    for hit in playbook_registry.get().pattern_index.find(text):
+        if hit.category in seen:
+            continue
+        seen.add(hit.category)
+        start, end = next(((a, b) for a, b in sections if a <= hit.start < b), (hit.start, hit.end))
+        # A model quotes the clause, not the prefilter's window separator
+        body = text[start:end].split("[...]")[0].strip()[:1500]
+        heading = re.match(r"\s*([^\n]{1,80})", body)
+        clauses.append({"type": hit.category, "text": body, "section": heading.group(1).strip() if heading else None})
+    return clauses
+
+
+def _fake_audit(human: str) -> dict:
+    """Flags every clause that contains one of its category's toxic patterns."""
+    try:
+        clauses = json.loads(human.split("Extracted Clauses:", 1)[-1])
+    except json.JSONDecodeError:
+        clauses = []
+    playbook = playbook_registry.get()
+    levels = {c["name"]: c.get("risk_level", "Medium") for c in playbook.data.get("risk_categories", [])}
+    risks = []
+    for clause in clauses:
+        toxic = [h for h in playbook.pattern_index.find(clause.get("text", "")) if h.kind == "toxic"]
+        if not toxic:
+            continue
+        risks.append({
+            "clause_id": clause.get("id"),
+            "clause_type": clause.get("type"),
+            "risk_level": levels.get(toxic[0].category, "Medium"),
+            "issue": f"Contains playbook toxic pattern '{toxic[0].text}'.",
+            "toxic_language": toxic[0].text,
+            "suggested_alternative": "Replace with the playbook benchmark language for this category.",
+            "recommendation": "Negotiate this clause before signing.",
+        })
+    score = min(100, 30 * sum(1 for r in risks if r["risk_level"] == "High") + 15 * len(risks))
+    return {"risks": risks, "risk_score": score}
+
+
+def _fake_critique(system: str) -> dict:
+    """Approves every finding; the benchmark measures the single-pass path."""
+    ids = [int(i) for i in re.findall(r'"id":\s*(\d+)', system.split("RISK AUDIT TO REVIEW", 1)[-1])]
+    return {
+        "critic_approved": True,
+        "feedback": "Looks good",
+        "risk_verdicts": [{"id": i, "approved": True, "reason": ""} for i in ids],
+        "missed_clauses": [],
+    }
@@ -1,8 +1,12 @@
 from langgraph.graph import StateGraph, END
+from langgraph.types import Send
 from app.models import ContractState
 from app.agents.extractor import extract_clauses
-from app.agents.auditor import audit_risks
+from app.agents.auditor import audit_risks, audit_category, category_groups
 from app.agents.critic import critique_audit
+from app.agents.checkpoint import checkpointer
+from app.metrics import timed_node
+from app.config import settings
 
 def should_continue(state: ContractState):
     """Conditional edge to determine if we loop back to auditor or continue to report."""
@@ -10,6 +14,21 @@ def should_continue(state: ContractState):
         return "generate_report"
     return "audit_risks"
 
+def fan_out_audit(state: ContractState):
+    """First audit pass: one concurrent audit per clause category, joined in audit_risks."""
+    groups = category_groups(state["clauses"])
+    if len(groups) < 2:
+        return "audit_risks"
+    return [
+        Send("audit_category", {
+            "category": category,
+            "clause_ids": clause_ids,
+            "clauses": state["clauses"],
+            "prefetched_risks": state.get("prefetched_risks") or {},
+        })
+        for category, clause_ids in groups.items()
+    ]
+
 def generate_report_node(state: ContractState) -> ContractState:
     """Placeholder node for report generation."""
     # This will be replaced by the actual report generator logic
@@ -17,20 +36,25 @@ def generate_report_node(state: ContractState) -> ContractState:
     state["report"] = generate_markdown_report(state)
     return state
 
-def create_graph():
+def create_graph(checkpointer=None):
     workflow = StateGraph(ContractState)
     
-    # Add Nodes
-    workflow.add_node("extract_clauses", extract_clauses)
-    workflow.add_node("audit_risks", audit_risks)
-    workflow.add_node("critique_audit", critique_audit)
-    workflow.add_node("generate_report", generate_report_node)
+    # Add Nodes (each run is timed into /metrics and the job trace)
+    workflow.add_node("extract_clauses", timed_node("extract_clauses", extract_clauses))
+    workflow.add_node("audit_risks", timed_node("audit_risks", audit_risks))
+    workflow.add_node("audit_category", timed_node("audit_category", audit_category))
+    workflow.add_node("critique_audit", timed_node("critique_audit", critique_audit))
+    workflow.add_node("generate_report", timed_node("generate_report", generate_report_node))
     
     # Set Entry Point
     workflow.set_entry_point("extract_clauses")
     
     # Add Edges
-    workflow.add_edge("extract_clauses", "audit_risks")
+    if settings.AUDIT_FAN_OUT:
+        workflow.add_conditional_edges("extract_clauses", fan_out_audit, ["audit_category", "audit_risks"])
+        workflow.add_edge("audit_category", "audit_risks")
+    else:
+        workflow.add_edge("extract_clauses", "audit_risks")
     workflow.add_edge("audit_risks", "critique_audit")
     
     # Add Conditional Edges
@@ -45,4 +69,16 @@ def create_graph():
     
     workflow.add_edge("generate_report", END)
     
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
+
+_compiled_graph = None
+
+def get_graph():
+    """
+    Returns the process-wide compiled graph, compiling it on first use.
+    With checkpoints enabled every run needs {"configurable": {"thread_id": job_id}}.
+    """
+    global _compiled_graph
+    if _compiled_graph is None:
+        _compiled_graph = create_graph(checkpointer)
+    return _compiled_graph
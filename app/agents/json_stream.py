@@ -0,0 +1,197 @@
+import json
+from typing import Any, AsyncIterator, List, Optional
+from langchain_core.prompts import ChatPromptTemplate
+from app.agents.utils import get_llm, ainvoke_chain, astream_chain
+from app import metrics
+
+repair_prompt = ChatPromptTemplate.from_messages([
+    ("system", """You fix malformed JSON produced by another model.
+    The fragment below should be {expected}.
+    Return ONLY the corrected JSON, with no commentary and no code fence.
+    Keep every field and value that is present; close any truncated strings, objects or arrays.
+    """),
+    ("human", "{fragment}")
+])
+
+
+def extract_json(content: str) -> str:
+    """The JSON part of a reply: the body of a code fence if there is one, else from the first bracket on."""
+    if "```json" in content:
+        return content.split("```json")[1].split("```")[0].strip()
+    if "```" in content:
+        return content.split("```")[1].split("```")[0].strip()
+    starts = [i for i in (content.find("{"), content.find("[")) if i >= 0]
+    return content[min(starts):].strip() if starts else content.strip()
+
+
+class JSONItemParser:
+    """
+    Incremental parser over a streamed JSON reply.
+    Returns the raw text of each object in the top-level array (or in the array
+    under `key` of a top-level object) as soon as that object is complete.
+    Anything before the JSON, such as prose or a ```json fence, is skipped.
+    `entered` tells whether the target array was found at all: a reply can finish
+    without it (a bare list, or an object missing `key`) and still yield nothing.
+    """
+
+    def __init__(self, key: Optional[str] = None):
+        self.key = key
+        self._item_depth = 1 if key is None else 2
+        self._in_target = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string: List[str] = []
+        self._last_string = ""
+        self._current_key: Optional[str] = None
+        self._item: Optional[List[str]] = None
+        self.started = False
+        self.entered = False
+        self.finished = False
+
+    def remainder(self) -> Optional[str]:
+        """The incomplete object the stream stopped in, if it was truncated."""
+        return "".join(self._item) if self._item else None
+
+    def feed(self, chunk: str) -> List[str]:
+        items = []
+        for ch in chunk:
+            if self.finished:
+                break
+            if not self.started:
+                if ch == ("[" if self.key is None else "{"):
+                    self.started = True
+                    self._depth = 1
+                    self._in_target = self.entered = self.key is None
+                continue
+            if self._item is not None:
+                self._item.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = "".join(self._string)
+                else:
+                    self._string.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string = []
+            elif ch == ":" and self._depth == 1:
+                self._current_key = self._last_string
+            elif ch in "[{":
+                if self._in_target and self._depth == self._item_depth and ch == "{":
+                    self._item = [ch]
+                elif self._depth == 1 and ch == "[" and self.key is not None and self._current_key == self.key:
+                    self._in_target = self.entered = True
+                self._depth += 1
+            elif ch in "]}":
+                self._depth -= 1
+                if self._item is not None and self._depth == self._item_depth:
+                    items.append("".join(self._item))
+                    self._item = None
+                elif self._depth == self._item_depth - 1 and self.key is not None and self._in_target:
+                    self._in_target = False
+                if self._depth == 0:
+                    self.finished = True
+        return items
+
+
+async def repair_json(fragment: str, expected: str, agent: str) -> Any:
+    """One targeted repair call for a malformed fragment; None if it still doesn't parse."""
+    response = await ainvoke_chain(repair_prompt | get_llm(temperature=0.0), {"fragment": fragment, "expected": expected})
+    try:
+        return json.loads(extract_json(response.content))
+    except json.JSONDecodeError:
+        print(f"Repair of malformed {agent} output failed")
+        return None
+
+
+async def parse_json_reply(content: str, expected: str, agent: str) -> Any:
+    """Parses a complete reply, repairing it once if needed. Raises ValueError if it can't be recovered."""
+    fragment = extract_json(content)
+    try:
+        return json.loads(fragment)
+    except json.JSONDecodeError as e:
+        print(f"Error parsing {agent} output: {e}")
+        metrics.record_parse_failure(agent)
+    repaired = await repair_json(fragment, expected, agent)
+    if repaired is None:
+        raise ValueError(f"Unrecoverable {agent} output")
+    return repaired
+
+
+class ItemStream:
+    """
+    Streams a chain's reply and yields each array object as it completes.
+    Malformed objects, and the last one of a truncated reply, get a repair call
+    of their own; the rest of the reply is never re-requested. A reply that
+    ends without the expected array goes through parse_json_reply as a whole.
+    """
+
+    def __init__(self, chain, inputs: dict, agent: str, item: str, key: Optional[str] = None):
+        self.chain = chain
+        self.inputs = inputs
+        self.agent = agent
+        self.item = item
+        self.key = key
+        self.parser = JSONItemParser(key)
+        self.dropped = 0
+        self.recovered = False
+
+    @property
+    def complete(self) -> bool:
+        """True when the reply was a well-formed array of valid items, safe to cache as-is."""
+        return self.parser.finished and self.parser.entered and not self.dropped and not self.recovered
+
+    async def _item(self, raw: str) -> Optional[dict]:
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            metrics.record_parse_failure(self.agent)
+            value = await repair_json(raw, f"a single JSON object: {self.item}", self.agent)
+        if not isinstance(value, dict):
+            self.dropped += 1
+            return None
+        return value
+
+    async def _recover(self, reply: str) -> List[dict]:
+        """Items from a reply that didn't have the expected shape, e.g. a bare list instead of {key: [...]}."""
+        print(f"{self.agent} output has no {self.key!r} array, parsing the whole reply")
+        metrics.record_parse_failure(self.agent)
+        self.recovered = True
+        expected = f'a JSON object with a "{self.key}" array of {self.item} objects'
+        value = await parse_json_reply(reply, expected, self.agent)
+        if isinstance(value, dict):
+            value = value.get(self.key)
+        if not isinstance(value, list):
+            raise ValueError(f"No {self.key!r} array in {self.agent} output")
+        return [item for item in value if isinstance(item, dict)]
+
+    async def __aiter__(self) -> AsyncIterator[dict]:
+        reply: List[str] = []
+        async for chunk in astream_chain(self.chain, self.inputs):
+            reply.append(chunk)
+            for raw in self.parser.feed(chunk):
+                value = await self._item(raw)
+                if value is not None:
+                    yield value
+
+        remainder = self.parser.remainder()
+        if remainder:
+            print(f"Truncated {self.agent} output, repairing the last item")
+            value = await self._item(remainder)
+            if value is not None:
+                yield value
+        elif not self.parser.started:
+            # Nothing JSON-shaped came back at all
+            metrics.record_parse_failure(self.agent)
+        elif self.parser.finished and not self.parser.entered:
+            for value in await self._recover("".join(reply)):
+                yield value
@@ -0,0 +1,126 @@
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from app.agents.chunker import section_bounds
+
+
+class PatternHit(NamedTuple):
+    category: str
+    kind: str  # "toxic" or "keyword"
+    start: int
+    end: int
+    text: str
+
+
+def _phrase_regex(phrase: str, stem: bool) -> str:
+    """
+    Turns a playbook phrase into a whitespace-tolerant regex.
+    "[placeholder]" segments match any short run of text; keywords match as word stems.
+    """
+    parts = re.split(r"\[[^\]]*\]", phrase)
+    words = [r"\s+".join(re.escape(w) for w in part.split()) for part in parts]
+    body = r"\b.{0,60}?\b".join(w for w in words if w)
+    return rf"\b{body}\w*" if stem else rf"\b{body}\b"
+
+
+class PlaybookPatternIndex:
+    """
+    One combined, case-insensitive regex over every playbook toxic pattern and
+    category keyword. A single pass over the document yields every hit with its
+    category and character offsets.
+    """
+
+    def __init__(self, playbook: Dict[str, Any]):
+        self._groups: Dict[str, Tuple[str, str]] = {}
+        alternatives = []
+        for i, category in enumerate(playbook.get("risk_categories", [])):
+            for kind, phrases, stem in (
+                ("toxic", category.get("toxic_patterns", []), False),
+                ("keyword", category.get("keywords", []), True),
+            ):
+                if not phrases:
+                    continue
+                group = f"{kind[0]}{i}"
+                self._groups[group] = (category["name"], kind)
+                # Longest phrases first so the most specific alternative wins
+                ordered = sorted(phrases, key=len, reverse=True)
+                alternatives.append(f"(?P<{group}>" + "|".join(_phrase_regex(p, stem) for p in ordered) + ")")
+        # Toxic groups precede keyword groups so an exact toxic phrase isn't shadowed by its keyword
+        alternatives.sort(key=lambda alt: not alt.startswith("(?P<t"))
+        self._regex = re.compile("|".join(alternatives), re.IGNORECASE) if alternatives else None
+
+    def find(self, text: str) -> List[PatternHit]:
+        if self._regex is None:
+            return []
+        hits = []
+        for m in self._regex.finditer(text):
+            category, kind = self._groups[m.lastgroup]
+            hits.append(PatternHit(category, kind, m.start(), m.end(), m.group(0)))
+        return hits
+
+
+# Boundaries to align window edges to, preferred first: paragraph, line, sentence
+_BOUNDARIES = ("\n\n", "\n", ". ")
+
+
+def _snap_to_boundaries(text: str, start: int, end: int, lo: int, hi: int) -> Tuple[int, int]:
+    """
+    Trims [lo, hi) so it starts and ends on the outermost paragraph, line or
+    sentence boundary that still keeps [start, end) inside. Never widens it.
+    """
+    new_lo, new_hi = lo, hi
+    for sep in _BOUNDARIES:
+        pos = text.find(sep, lo, start)
+        if pos != -1:
+            new_lo = pos + len(sep)
+            break
+    for sep in _BOUNDARIES:
+        pos = text.rfind(sep, end, hi)
+        if pos != -1:
+            # Keep the full stop with its sentence
+            new_hi = pos + 1 if sep == ". " else pos
+            break
+    return new_lo, new_hi
+
+
+def candidate_windows(text: str, hits: List[PatternHit], max_window: int) -> List[Tuple[int, int]]:
+    """
+    Expands each hit to its enclosing section or, when the section is longer than
+    max_window, to a window of at most max_window chars around the hit, aligned to
+    paragraph, line or sentence boundaries. Overlapping ranges are then merged.
+    """
+    if not hits:
+        return []
+    sections = section_bounds(text)
+    windows = []
+    for hit in hits:
+        lo, hi = next(((a, b) for a, b in sections if a <= hit.start < b), (0, len(text)))
+        if hi - lo > max_window:
+            half = max(max_window - (hit.end - hit.start), 0) // 2
+            lo, hi = max(lo, hit.start - half), min(hi, hit.end + half)
+            lo, hi = _snap_to_boundaries(text, hit.start, hit.end, lo, hi)
+        windows.append((lo, hi))
+
+    windows.sort()
+    merged = [windows[0]]
+    for lo, hi in windows[1:]:
+        if lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def locate_clause(document_text: str, clause_text: str) -> Optional[int]:
+    """Character offset of an extracted clause in the source document, if it can be found."""
+    if not clause_text:
+        return None
+    offset = document_text.find(clause_text)
+    if offset != -1:
+        return offset
+    # Models often reflow whitespace; match the opening words whitespace-insensitively
+    words = clause_text.split()[:12]
+    if not words:
+        return None
+    m = re.search(r"\s+".join(re.escape(w) for w in words), document_text)
+    return m.start() if m else None
+
@@ -0,0 +1,77 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, NamedTuple, Optional
+from app.agents.pattern_index import PlaybookPatternIndex
+from app.config import settings
+
+# Keys used only locally (pattern matching, scoring); they are never sent to the model
+_LOCAL_ONLY_KEYS = {"keywords", "weight"}
+
+
+class Playbook(NamedTuple):
+    data: Dict[str, Any]
+    version: str  # SHA-256 of the playbook file contents
+    fragments: Dict[str, str]  # lower-cased category name -> compact JSON for prompts
+    pattern_index: PlaybookPatternIndex
+    weights: Dict[str, float]  # lower-cased category name -> risk score weight (default 1.0)
+
+    def render(self, categories: Optional[Iterable[str]] = None) -> str:
+        """
+        Prompt text for the given categories, one compact JSON object per line.
+        Falls back to the whole playbook when none of the categories are known.
+        """
+        wanted = {c.strip().lower() for c in categories or [] if c}
+        selected = [frag for name, frag in self.fragments.items() if name in wanted]
+        return "\n".join(selected or self.fragments.values())
+
+
+def _build(raw: bytes) -> Playbook:
+    data = json.loads(raw)
+    fragments, weights = {}, {}
+    for category in data.get("risk_categories", []):
+        prompt_view = {k: v for k, v in category.items() if k not in _LOCAL_ONLY_KEYS}
+        fragments[category["name"].lower()] = json.dumps(prompt_view, separators=(",", ":"), ensure_ascii=False)
+        weights[category["name"].lower()] = float(category.get("weight", 1.0))
+    return Playbook(data, hashlib.sha256(raw).hexdigest(), fragments, PlaybookPatternIndex(data), weights)
+
+
+_EMPTY = _build(b'{"risk_categories": []}')
+
+
+class PlaybookRegistry:
+    """
+    Loads the risk playbook once and reloads it only when the file's mtime changes,
+    keeping pre-rendered prompt fragments and the pattern index alongside it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._playbook = _EMPTY
+
+    def get(self) -> Playbook:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            print(f"Error loading risk playbook: {e}")
+            return self._playbook
+        if mtime == self._mtime:
+            return self._playbook
+
+        with self._lock:
+            if mtime != self._mtime:
+                try:
+                    with open(self.path, "rb") as f:
+                        self._playbook = _build(f.read())
+                    print(f"Loaded risk playbook {self._playbook.version[:12]} ({len(self._playbook.fragments)} categories)")
+                except Exception as e:
+                    # Keep serving the last good playbook if an edit is half-written or invalid
+                    print(f"Error loading risk playbook: {e}")
+                self._mtime = mtime
+        return self._playbook
+
+
+playbook_registry = PlaybookRegistry(settings.RISK_PLAYBOOK_PATH)
@@ -0,0 +1,62 @@
+import re
+from typing import Dict, List, NamedTuple, Optional
+from app.agents.clause_cache import normalize_clause
+from app.agents.playbook import Playbook
+from app.models import ExtractedClause, Risk
+
+# toxic_language values that mean "nothing to quote" (e.g. a missing protection)
+_NO_QUOTE = {"", "n a", "na", "none", "null", "not applicable"}
+
+
+class RuleFailure(NamedTuple):
+    kind: str  # "hallucination", "missed_risk" or "severity"
+    risk_id: Optional[int]
+    clause_id: Optional[int]
+    reason: str
+
+
+def _quote_found(quote: str, clause_text: str) -> bool:
+    """Whether every part of a (possibly elided) quote appears in the clause, ignoring case and punctuation."""
+    parts = [normalize_clause(p) for p in re.split(r"\.\.\.|…", quote)]
+    return all(part in clause_text for part in parts if part)
+
+
+def check_audit(clauses: List[ExtractedClause], risks: List[Risk], playbook: Playbook) -> List[RuleFailure]:
+    """
+    Deterministic checks a critic would otherwise spend an LLM call on:
+    quoted toxic language must appear in its clause, clauses with no finding must not
+    contain a playbook toxic pattern, and severities must match the playbook risk_level.
+    """
+    failures = []
+    texts = [normalize_clause(c.get("text", "")) for c in clauses]
+    levels: Dict[str, str] = {
+        c["name"].lower(): str(c.get("risk_level", "")).lower() for c in playbook.data.get("risk_categories", [])
+    }
+
+    for risk_id, risk in enumerate(risks):
+        clause_id = risk.get("clause_id")
+        if not isinstance(clause_id, int) or not 0 <= clause_id < len(clauses):
+            clause_id = None
+        quote = str(risk.get("toxic_language") or "")
+        if normalize_clause(quote) not in _NO_QUOTE:
+            if clause_id is not None:
+                candidates = [texts[clause_id]]
+            else:
+                ctype = str(risk.get("clause_type", "")).strip().lower()
+                candidates = [t for t, c in zip(texts, clauses) if (c.get("type") or "").strip().lower() == ctype]
+            if not any(_quote_found(quote, text) for text in candidates):
+                failures.append(RuleFailure("hallucination", risk_id, clause_id, f'Quoted toxic language "{quote}" does not appear in the clause.'))
+
+        expected = levels.get(str(risk.get("clause_type", "")).strip().lower())
+        level = str(risk.get("risk_level", "")).lower()
+        if expected and level != expected:
+            failures.append(RuleFailure("severity", risk_id, clause_id, f"Rated {risk.get('risk_level')} but the playbook rates this category {expected.title()}."))
+
+    flagged = {risk.get("clause_id") for risk in risks}
+    for clause_id, clause in enumerate(clauses):
+        if clause_id in flagged:
+            continue
+        toxic = [hit for hit in playbook.pattern_index.find(clause.get("text", "")) if hit.kind == "toxic"]
+        if toxic:
+            failures.append(RuleFailure("missed_risk", None, clause_id, f'Contains the playbook toxic pattern "{toxic[0].text}" but no risk was raised.'))
+    return failures
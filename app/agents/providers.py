@@ -0,0 +1,77 @@
+from typing import Callable, Dict
+from app.config import settings
+
+# Provider name -> builder. Each builder imports its LangChain integration on first
+# use, so a process only ever loads the SDK of the provider it actually calls.
+
+
+def _google(temperature: float):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model=settings.MODEL_NAME if "gemini" in settings.MODEL_NAME else settings.GOOGLE_MODEL_NAME,
+        google_api_key=settings.GOOGLE_API_KEY,
+        temperature=temperature,
+    )
+
+
+def _groq(temperature: float):
+    from langchain_groq import ChatGroq
+    return ChatGroq(
+        model=settings.MODEL_NAME if "llama" in settings.MODEL_NAME else "llama-3.3-70b-versatile",
+        groq_api_key=settings.GROQ_API_KEY,
+        temperature=temperature
+    )
+
+
+def _groq_default(temperature: float):
+    from langchain_groq import ChatGroq
+    return ChatGroq(
+        model="llama-3.3-70b-versatile",
+        groq_api_key=settings.GROQ_API_KEY,
+        temperature=temperature
+    )
+
+
+def _openrouter(temperature: float):
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(
+        model=settings.OPENROUTER_MODEL,
+        openai_api_key=settings.OPENROUTER_API_KEY,
+        openai_api_base="https://openrouter.ai/api/v1",
+        temperature=temperature,
+        default_headers={
+            "HTTP-Referer": "https://github.com/ZeeshanHQ/autonomous-contract-auditor",
+            "X-Title": "Contract Auditor AI"
+        }
+    )
+
+
+def _fake(temperature: float):
+    # Offline provider for benchmarks and local development
+    from app.agents.fake_llm import FakeContractLLM
+    return FakeContractLLM(
+        latency_ms=settings.FAKE_LLM_LATENCY_MS,
+        jitter_ms=settings.FAKE_LLM_JITTER_MS,
+        error_rate=settings.FAKE_LLM_ERROR_RATE,
+    )
+
+
+PROVIDERS: Dict[str, Callable[[float], object]] = {
+    "google": _google,
+    "groq": _groq,
+    "openrouter": _openrouter,
+    "fake": _fake,
+}
+
+
+def build_llm(provider: str, temperature: float):
+    """Builds a chat client for `provider`, falling back to Groq if it is unknown or fails to initialize."""
+    try:
+        # Fallback to absolute default if something is wrong
+        return PROVIDERS.get(provider, _groq_default)(temperature)
+    except Exception as e:
+        print(f"Error initializing LLM provider {provider}: {e}")
+        # If primary fails, try to return Groq as the most reliable free backup
+        if provider != "groq" and settings.GROQ_API_KEY:
+            return _groq_default(temperature)
+        raise e
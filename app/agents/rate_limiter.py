@@ -0,0 +1,109 @@
+import asyncio
+import re
+import time
+from typing import Dict, Optional
+from app.config import settings
+
+
+class TokenBucket:
+    """Continuously refilling bucket holding up to `capacity` units per minute."""
+
+    def __init__(self, capacity_per_minute: int):
+        self.capacity = float(max(capacity_per_minute, 1))
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 if they already are)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        # Allowed to go negative so that under-estimated calls are paid back later
+        self.tokens -= amount
+
+
+class ProviderRateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budget for a single provider.
+    Waiters are served in arrival order, so concurrent jobs share capacity fairly.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._lock = asyncio.Lock()
+        self._blocked_until = 0.0
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                wait = max(
+                    self._blocked_until - now,
+                    self.requests.wait_time(1, now),
+                    self.tokens.wait_time(estimated_tokens, now),
+                )
+                if wait <= 0:
+                    self.requests.consume(1)
+                    self.tokens.consume(estimated_tokens)
+                    return
+                await asyncio.sleep(wait)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Corrects the token bucket once the provider reports real usage."""
+        self.tokens.consume(actual_tokens - estimated_tokens)
+
+    def backoff(self, seconds: float) -> None:
+        """Pauses every caller of this provider, e.g. after a 429 with Retry-After."""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+_limiters: Dict[str, ProviderRateLimiter] = {}
+
+
+def get_rate_limiter(provider: str) -> ProviderRateLimiter:
+    """Returns the process-wide limiter for a provider."""
+    if provider not in _limiters:
+        budget = settings.LLM_RATE_LIMITS.get(provider, settings.LLM_RATE_LIMITS["groq"])
+        _limiters[provider] = ProviderRateLimiter(budget["rpm"], budget["tpm"])
+    return _limiters[provider]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap prompt-size estimate (~4 characters per token) plus the expected completion."""
+    return len(text) // 4 + settings.LLM_COMPLETION_TOKEN_ESTIMATE
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Returns how long to back off if `error` is a rate-limit response, else None.
+    Prefers the Retry-After header and falls back to the hint in the error message.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    message = str(error)
+    if status != 429 and "429" not in message and "rate limit" not in message.lower():
+        return None
+
+    headers = getattr(response, "headers", None) or {}
+    retry_after = headers.get("retry-after") if hasattr(headers, "get") else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+
+    match = re.search(r"(?:try again|retry) in ([\d.]+)\s*(ms|s)", message, re.IGNORECASE)
+    if match:
+        seconds = float(match.group(1))
+        return seconds / 1000 if match.group(2).lower() == "ms" else seconds
+    return settings.LLM_DEFAULT_BACKOFF_SECONDS
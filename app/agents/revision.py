@@ -0,0 +1,170 @@
+import hashlib
+import re
+from bisect import bisect_right
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Tuple
+from app.agents.auditor import finding_key
+from app.agents.chunker import section_bounds
+from app.models import ExtractedClause, Risk
+
+# Same-type clauses at least this similar (word-level) are one clause, revised
+MODIFIED_SIMILARITY = 0.5
+
+
+def _find_verbatim(document_text: str, clause_text: str) -> Optional[Tuple[int, int]]:
+    """Span of the whole clause text in the document, ignoring whitespace differences."""
+    words = clause_text.split()
+    if not words:
+        return None
+    m = re.search(r"\s+".join(re.escape(w) for w in words), document_text)
+    return m.span() if m else None
+
+
+def document_sections(document_text: str) -> List[Dict[str, Any]]:
+    """
+    Hash and character range of each section. Hashes ignore whitespace, so a section
+    whose text is unchanged hashes the same even if the PDF reflowed it.
+    """
+    return [
+        {"hash": hashlib.sha256(" ".join(document_text[a:b].split()).encode()).hexdigest()[:16], "start": a, "end": b}
+        for a, b in section_bounds(document_text)
+    ]
+
+
+def carry_sections(
+    document_text: str, sections: List[Dict[str, Any]], previous: List[ExtractedClause], previous_sections: List[Dict[str, Any]]
+) -> Tuple[List[ExtractedClause], str]:
+    """
+    Previous-version clauses from sections whose text is unchanged, and the text of
+    the sections that changed or are new: the only text that needs extracting again.
+    Clauses the previous audit could not place in its document are carried only if
+    none of its sections changed or went away.
+    """
+    current = {s["hash"] for s in sections}
+    kept = [s["hash"] in current for s in previous_sections]
+    starts = [s["start"] for s in previous_sections]
+    carried = []
+    for clause in previous:
+        offset = clause.get("offset")
+        if offset is None:
+            keep = all(kept)
+        else:
+            index = bisect_right(starts, offset) - 1
+            keep = 0 <= index < len(kept) and kept[index]
+        if keep:
+            carried.append({k: v for k, v in clause.items() if k not in ("offset", "page")})
+    unchanged = {s["hash"] for s in previous_sections}
+    changed = [document_text[s["start"]:s["end"]] for s in sections if s["hash"] not in unchanged]
+    return carried, "\n\n".join(part for part in changed if part.strip())
+
+
+def carry_unchanged(document_text: str, previous: List[ExtractedClause]) -> Tuple[List[ExtractedClause], str]:
+    """
+    Previous-version clauses whose text still appears word for word in the new
+    document, and the document with those clauses blanked out: the only text
+    that needs extracting again.
+    """
+    carried, spans = [], []
+    for clause in previous:
+        span = _find_verbatim(document_text, clause.get("text", ""))
+        # Two clause types quoted from one section share a span
+        if span is None or any(a < span[1] and span[0] < b and (a, b) != span for a, b in spans):
+            continue
+        if span not in spans:
+            spans.append(span)
+        carried.append({k: v for k, v in clause.items() if k not in ("offset", "page")})
+    residual, position = [], 0
+    for start, end in sorted(spans):
+        residual.append(document_text[position:start])
+        position = end
+    residual.append(document_text[position:])
+    return carried, "\n\n".join(part for part in residual if part.strip())
+
+
+def previous_findings(clauses: List[ExtractedClause], risks: List[Risk]) -> Dict[str, List[Risk]]:
+    """Previous-version findings keyed like the audit prefetcher's, so unchanged clauses reuse them."""
+    findings: Dict[str, List[Risk]] = {finding_key(clause): [] for clause in clauses}
+    for risk in risks:
+        clause_id = risk.get("clause_id")
+        if isinstance(clause_id, int) and 0 <= clause_id < len(clauses):
+            findings[finding_key(clauses[clause_id])].append({k: v for k, v in risk.items() if k != "clause_id"})
+    return findings
+
+
+def _words(clause: ExtractedClause) -> List[str]:
+    return (clause.get("text") or "").split()
+
+
+def word_diff(old: str, new: str, limit: int = 600) -> str:
+    """Markdown word diff: removed words struck through, added words in bold."""
+    a, b = old.split(), new.split()
+    parts = []
+    for op, i1, i2, j1, j2 in SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if op == "equal":
+            words = a[i1:i2]
+            parts.append(" ".join(words) if len(words) <= 12 else f"{' '.join(words[:5])} … {' '.join(words[-5:])}")
+            continue
+        if i2 > i1:
+            parts.append(f"~~{' '.join(a[i1:i2])}~~")
+        if j2 > j1:
+            parts.append(f"**{' '.join(b[j1:j2])}**")
+    diff = " ".join(parts)
+    return diff if len(diff) <= limit else diff[:limit] + " …"
+
+
+def diff_clauses(previous: List[ExtractedClause], current: List[ExtractedClause], previous_risks: List[Risk]) -> Dict[str, Any]:
+    """
+    Clause-level diff between two versions: unchanged clauses match exactly (type and
+    normalized text); remaining clauses of the same type are paired as modified by word
+    similarity; the rest are added (new version) or removed (previous version).
+    Modified and removed entries list the risk levels the previous version had on them.
+    """
+    levels: Dict[int, List[str]] = {}
+    for risk in previous_risks:
+        if isinstance(risk.get("clause_id"), int):
+            levels.setdefault(risk["clause_id"], []).append(risk.get("risk_level", "UNKNOWN"))
+
+    by_key: Dict[str, List[int]] = {}
+    for j, clause in enumerate(previous):
+        by_key.setdefault(finding_key(clause), []).append(j)
+
+    unchanged, open_current = {}, []
+    for i, clause in enumerate(current):
+        matches = by_key.get(finding_key(clause))
+        if matches:
+            unchanged[i] = matches.pop(0)
+        else:
+            open_current.append(i)
+    open_previous = {j for js in by_key.values() for j in js}
+
+    candidates = []
+    for i in open_current:
+        ctype = (current[i].get("type") or "").strip().lower()
+        for j in open_previous:
+            if (previous[j].get("type") or "").strip().lower() == ctype:
+                ratio = SequenceMatcher(None, _words(previous[j]), _words(current[i]), autojunk=False).ratio()
+                if ratio >= MODIFIED_SIMILARITY:
+                    candidates.append((ratio, i, j))
+    modified = {}
+    for ratio, i, j in sorted(candidates, reverse=True):
+        if i not in modified and j in open_previous:
+            modified[i] = j
+            open_previous.discard(j)
+
+    return {
+        "unchanged": sorted(unchanged),
+        "modified": [
+            {
+                "id": i,
+                "previous_id": j,
+                "diff": word_diff(previous[j].get("text", ""), current[i].get("text", "")),
+                "previous_risks": levels.get(j, []),
+            }
+            for i, j in sorted(modified.items())
+        ],
+        "added": [i for i in open_current if i not in modified],
+        "removed": [
+            {**{k: previous[j].get(k) for k in ("type", "section", "text")}, "previous_risks": levels.get(j, [])}
+            for j in sorted(open_previous)
+        ],
+    }
@@ -0,0 +1,183 @@
+import asyncio
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from app.config import settings
+from app import metrics
+
+# Providers that can take a call without extra setup: those with an API key configured
+_API_KEYS = {"google": "GOOGLE_API_KEY", "groq": "GROQ_API_KEY", "openrouter": "OPENROUTER_API_KEY"}
+# Providers whose calls are never routed elsewhere: the offline fake must stay offline
+_PINNED = {"fake"}
+
+
+# Latency samples are kept per (pipeline stage, call kind): an extraction call over a
+# long chunk and a short critic call have very different normal latencies
+Bucket = Tuple[str, str]
+
+
+class ProviderHealth:
+    """Rolling latency samples (per bucket) and outcomes for one provider."""
+
+    def __init__(self, window: int):
+        self.latency: Dict[Bucket, Deque[float]] = {}
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.window = window
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    def p95(self, bucket: Bucket, min_samples: int) -> Optional[float]:
+        samples = self.latency.get(bucket)
+        if not samples or len(samples) < min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(int(0.95 * len(ordered)), len(ordered) - 1)]
+
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+
+class ProviderRouter:
+    """
+    Routes LLM calls across providers. A call goes to the first healthy provider in
+    the order [primary, *LLM_FALLBACK_PROVIDERS]; if it fails, the next one is tried.
+    If it is still running after that provider's observed p95 latency for calls of the
+    same stage (graph node) and kind, a hedged copy goes to the next healthy provider
+    and whichever answers first wins. Providers that keep failing are put on cooldown
+    and skipped until it expires. Pinned providers (the fake) are never routed away from.
+    """
+
+    def __init__(self):
+        self._health: Dict[str, ProviderHealth] = {}
+
+    def health(self, provider: str) -> ProviderHealth:
+        if provider not in self._health:
+            self._health[provider] = ProviderHealth(settings.LLM_HEALTH_WINDOW)
+        return self._health[provider]
+
+    def candidates(self, primary: str) -> List[str]:
+        """Providers to try, in order: available ones off cooldown, or just the primary if none are."""
+        if primary in _PINNED:
+            return [primary]
+        now = time.monotonic()
+        order = [primary] + [p for p in settings.LLM_FALLBACK_PROVIDERS if p != primary]
+        available = [
+            p for p in dict.fromkeys(order)
+            if (p == primary or getattr(settings, _API_KEYS.get(p, ""), None)) and self.health(p).cooldown_until <= now
+        ]
+        return available or [primary]
+
+    def record(self, provider: str, bucket: Bucket, seconds: float, ok: bool) -> None:
+        health = self.health(provider)
+        health.outcomes.append(ok)
+        if ok:
+            health.latency.setdefault(bucket, deque(maxlen=health.window)).append(seconds)
+            health.consecutive_failures = 0
+            return
+        health.consecutive_failures += 1
+        erroring = len(health.outcomes) >= 10 and health.error_rate() > 0.5
+        if health.consecutive_failures >= settings.LLM_COOLDOWN_FAILURES or erroring:
+            print(f"LLM provider {provider} is failing, cooling down for {settings.LLM_COOLDOWN_SECONDS:.0f}s")
+            health.cooldown_until = time.monotonic() + settings.LLM_COOLDOWN_SECONDS
+            health.consecutive_failures = 0
+            health.outcomes.clear()
+            metrics.llm_cooldowns.inc(provider)
+
+    def hedge_delay(self, provider: str, bucket: Bucket) -> Optional[float]:
+        return self.health(provider).p95(bucket, settings.LLM_HEDGE_MIN_SAMPLES)
+
+    async def _race(self, start: Callable[[str], Awaitable], primary: str, kind: str):
+        """
+        Runs `start(provider)` with failover and at most one hedge.
+        Returns (provider, result) of the first success, cancelling the other attempt.
+        """
+        bucket = (metrics.current_stage(), kind)
+        queue = self.candidates(primary)
+        running: Dict[asyncio.Task, Tuple[str, float]] = {}
+        hedged = False
+        error: Optional[BaseException] = None
+
+        def launch() -> None:
+            provider = queue.pop(0)
+            running[asyncio.ensure_future(start(provider))] = (provider, time.perf_counter())
+
+        launch()
+        try:
+            while running:
+                timeout = None
+                if queue and not hedged and len(running) == 1:
+                    (provider, started), = running.values()
+                    delay = self.hedge_delay(provider, bucket)
+                    if delay is not None:
+                        timeout = max(started + delay - time.perf_counter(), 0.0)
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Slower than this provider's p95: send a duplicate elsewhere
+                    hedged = True
+                    metrics.llm_hedges.inc(provider)
+                    launch()
+                    continue
+                for task in done:
+                    provider, started = running.pop(task)
+                    if task.exception() is None:
+                        self.record(provider, bucket, time.perf_counter() - started, True)
+                        return provider, task.result()
+                    error = task.exception()
+                    self.record(provider, bucket, time.perf_counter() - started, False)
+                    print(f"LLM call to {provider} failed: {error}")
+                if not running and queue:
+                    metrics.llm_failovers.inc(provider)
+                    launch()
+            raise error
+        finally:
+            for task in running:
+                task.cancel()
+            # Let the losers unwind before their streams are closed
+            await asyncio.gather(*running, return_exceptions=True)
+
+    async def invoke(self, call: Callable[[str], Awaitable], primary: str):
+        """`call(provider)` routed across providers; returns the first successful result."""
+        _, result = await self._race(call, primary, "invoke")
+        return result
+
+    async def stream(self, open_stream: Callable[[str], AsyncIterator[str]], primary: str) -> AsyncIterator[str]:
+        """
+        Streams from whichever provider produces a first chunk first. Hedging and
+        failover apply up to the first chunk; after that the stream is committed.
+        """
+        streams: Dict[str, AsyncIterator[str]] = {}
+
+        async def first_chunk(provider: str) -> Optional[str]:
+            streams[provider] = open_stream(provider)
+            try:
+                return await streams[provider].__anext__()
+            except StopAsyncIteration:
+                return None
+
+        try:
+            provider, chunk = await self._race(first_chunk, primary, "first_chunk")
+        except BaseException:
+            for opened in streams.values():
+                await _close(opened)
+            raise
+        winner = streams.pop(provider)
+        for loser in streams.values():
+            await _close(loser)
+        if chunk is None:
+            return
+        try:
+            yield chunk
+            async for chunk in winner:
+                yield chunk
+        finally:
+            await _close(winner)
+
+
+async def _close(stream: AsyncIterator[str]) -> None:
+    try:
+        await stream.aclose()
+    except Exception as e:
+        print(f"Failed to close LLM stream: {e}")
+
+
+provider_router = ProviderRouter()
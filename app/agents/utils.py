@@ -1,57 +1,156 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_groq import ChatGroq
-from langchain_openai import ChatOpenAI
+import json
 import time
+from typing import AsyncIterator
+from langchain_core.messages.ai import add_usage
+from app.agents.providers import build_llm
+from app.agents.router import provider_router
+from app.agents.rate_limiter import get_rate_limiter, estimate_tokens, retry_after_seconds
 from app.config import settings
+from app import metrics
+
+# Chat model clients are stateless between calls, so one per (provider, temperature) is shared
+_llm_clients = {}
+# id(client) -> (provider, temperature), to re-target a chain at another provider
+_client_keys = {}
 
 def get_llm(temperature: float = 0.0, provider: str = None):
     """
     Returns an LLM instance based on the provider.
     Default provider is loaded from settings.
     """
-    # Small delay to prevent aggressive rate limiting on free tiers
-    time.sleep(1.2)
-    
     target_provider = provider or settings.LLM_PROVIDER
-    
-    try:
-        if target_provider == "google":
-            return ChatGoogleGenerativeAI(
-                model=settings.MODEL_NAME,
-                google_api_key=settings.GOOGLE_API_KEY,
-                temperature=temperature,
-            )
-        elif target_provider == "groq":
-            return ChatGroq(
-                model=settings.MODEL_NAME if "llama" in settings.MODEL_NAME else "llama-3.3-70b-versatile",
-                groq_api_key=settings.GROQ_API_KEY,
-                temperature=temperature
-            )
-        elif target_provider == "openrouter":
-            return ChatOpenAI(
-                model=settings.OPENROUTER_MODEL,
-                openai_api_key=settings.OPENROUTER_API_KEY,
-                openai_api_base="https://openrouter.ai/api/v1",
-                temperature=temperature,
-                default_headers={
-                    "HTTP-Referer": "https://github.com/ZeeshanHQ/autonomous-contract-auditor",
-                    "X-Title": "Contract Auditor AI"
-                }
-            )
-        else:
-            # Fallback to absolute default if something is wrong
-            return ChatGroq(
-                model="llama-3.3-70b-versatile",
-                groq_api_key=settings.GROQ_API_KEY,
-                temperature=temperature
-            )
-    except Exception as e:
-        print(f"Error initializing LLM provider {target_provider}: {e}")
-        # If primary fails, try to return Groq as the most reliable free backup
-        if target_provider != "groq" and settings.GROQ_API_KEY:
-            return ChatGroq(
-                model="llama-3.3-70b-versatile",
-                groq_api_key=settings.GROQ_API_KEY,
-                temperature=temperature
-            )
-        raise e
+    cache_key = (target_provider, temperature)
+    if cache_key not in _llm_clients:
+        _llm_clients[cache_key] = build_llm(target_provider, temperature)
+        _client_keys[id(_llm_clients[cache_key])] = cache_key
+    return _llm_clients[cache_key]
+
+def _routing(chain, provider: str):
+    """
+    (provider, temperature) of the chain's client when calls can be routed across
+    providers, else None: routing is off or the chain is not a prompt | get_llm() chain.
+    """
+    if not settings.LLM_ROUTING or provider is not None:
+        return None
+    return _client_keys.get(id(getattr(chain, "last", None)))
+
+def _for_provider(chain, provider: str, temperature: float):
+    """The same prompt piped into `provider`'s client."""
+    if provider == _client_keys[id(chain.last)][0]:
+        return chain
+    return chain.first | get_llm(temperature, provider)
+
+def _retries(primary: str) -> int:
+    # With somewhere to fail over to, a rate-limited provider is not waited on
+    return settings.LLM_MAX_RETRIES if len(provider_router.candidates(primary)) == 1 else 0
+
+async def ainvoke_chain(chain, inputs: dict, provider: str = None):
+    """
+    Runs a prompt | llm chain without blocking the event loop.
+    Calls go out as fast as the provider's shared RPM/TPM budget allows,
+    and rate-limit responses back off every caller of that provider.
+    With LLM_ROUTING, calls are hedged and fail over across providers (see router.py);
+    passing `provider` pins the call to that provider.
+    """
+    routing = _routing(chain, provider)
+    if routing is None:
+        return await _invoke_provider(chain, inputs, provider or settings.LLM_PROVIDER, settings.LLM_MAX_RETRIES)
+    primary, temperature = routing
+    retries = _retries(primary)
+    return await provider_router.invoke(
+        lambda target: _invoke_provider(_for_provider(chain, target, temperature), inputs, target, retries), primary
+    )
+
+async def _invoke_provider(chain, inputs: dict, target_provider: str, retries: int):
+    limiter = get_rate_limiter(target_provider)
+    estimated = estimate_tokens(json.dumps(inputs, default=str))
+
+    model = _model_label(chain, target_provider)
+    started = time.perf_counter()
+
+    for attempt in range(retries + 1):
+        await limiter.acquire(estimated)
+        try:
+            response = await chain.ainvoke(inputs)
+        except Exception as e:
+            backoff = retry_after_seconds(e)
+            if backoff is not None:
+                limiter.backoff(backoff)
+            if backoff is None or attempt == retries:
+                metrics.record_llm_call(target_provider, model, time.perf_counter() - started, None, attempt, failed=True)
+                raise
+            print(f"Rate limited by {target_provider}, backing off {backoff:.1f}s")
+            continue
+
+        usage = getattr(response, "usage_metadata", None)
+        if usage and usage.get("total_tokens"):
+            limiter.record_usage(estimated, usage["total_tokens"])
+        metrics.record_llm_call(target_provider, model, time.perf_counter() - started, usage, attempt)
+        return response
+
+async def astream_chain(chain, inputs: dict, provider: str = None) -> AsyncIterator[str]:
+    """
+    Streams a prompt | llm chain's reply as text chunks, under the same limits as ainvoke_chain.
+    Rate-limit errors are retried only until the first chunk arrives; a stream that
+    breaks off later just ends, and the caller handles the reply as truncated.
+    With LLM_ROUTING, the first chunk is hedged and fails over across providers.
+    """
+    routing = _routing(chain, provider)
+    if routing is None:
+        stream = _stream_provider(chain, inputs, provider or settings.LLM_PROVIDER, settings.LLM_MAX_RETRIES)
+    else:
+        primary, temperature = routing
+        retries = _retries(primary)
+        stream = provider_router.stream(
+            lambda target: _stream_provider(_for_provider(chain, target, temperature), inputs, target, retries), primary
+        )
+    async for text in stream:
+        yield text
+
+async def _stream_provider(chain, inputs: dict, target_provider: str, retries: int) -> AsyncIterator[str]:
+    limiter = get_rate_limiter(target_provider)
+    estimated = estimate_tokens(json.dumps(inputs, default=str))
+    model = _model_label(chain, target_provider)
+    started = time.perf_counter()
+
+    for attempt in range(retries + 1):
+        await limiter.acquire(estimated)
+        usage, received = None, False
+        try:
+            async for chunk in chain.astream(inputs):
+                received = True
+                if getattr(chunk, "usage_metadata", None):
+                    usage = add_usage(usage, chunk.usage_metadata) if usage else chunk.usage_metadata
+                text = _chunk_text(chunk)
+                if text:
+                    yield text
+        except Exception as e:
+            if received:
+                print(f"Stream from {target_provider} broke off: {e}")
+                metrics.record_llm_call(target_provider, model, time.perf_counter() - started, usage, attempt, failed=True)
+                return
+            backoff = retry_after_seconds(e)
+            if backoff is not None:
+                limiter.backoff(backoff)
+            if backoff is None or attempt == retries:
+                metrics.record_llm_call(target_provider, model, time.perf_counter() - started, None, attempt, failed=True)
+                raise
+            print(f"Rate limited by {target_provider}, backing off {backoff:.1f}s")
+            continue
+
+        if usage and usage.get("total_tokens"):
+            limiter.record_usage(estimated, usage["total_tokens"])
+        metrics.record_llm_call(target_provider, model, time.perf_counter() - started, usage, attempt)
+        return
+
+def _chunk_text(chunk) -> str:
+    # Some providers stream content as a list of typed parts rather than a string
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+def _model_label(chain, provider: str) -> str:
+    """Model name as reported by the chat client at the end of a prompt | llm chain."""
+    llm = getattr(chain, "last", chain)
+    return getattr(llm, "model_name", None) or getattr(llm, "model", None) or provider
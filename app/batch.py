@@ -0,0 +1,95 @@
+import os
+import zipfile
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+from app.uploads import UploadTooLarge, discard, spool_zip_member
+
+RISK_LEVEL_ORDER = {"High": 0, "Medium": 1, "Low": 2}
+
+
+def expand_uploads(uploads: List[Tuple[str, str, str]], max_documents: int, max_bytes: int, max_total_bytes: int) -> List[Tuple[str, str, str]]:
+    """
+    Flattens spooled uploads (filename, path, sha256) of PDFs and zip archives of PDFs into
+    (filename, path, sha256) triples, each PDF in a spooled file of its own.
+    Zip members are inflated to disk one chunk at a time and capped at max_bytes each
+    and max_total_bytes overall. Consumes every upload file; on error, every new file
+    is removed. Raises ValueError for unsupported files or more than max_documents
+    PDFs, and UploadTooLarge past either size cap.
+    """
+    documents: List[Tuple[str, str, str]] = []
+    total = 0
+    try:
+        for filename, path, digest in uploads:
+            lower = filename.lower()
+            if lower.endswith(".pdf"):
+                documents.append((filename, path, digest))
+                total += os.path.getsize(path)
+            elif lower.endswith(".zip"):
+                try:
+                    archive = zipfile.ZipFile(path)
+                except zipfile.BadZipFile:
+                    raise ValueError(f"{filename} is not a valid zip archive")
+                with archive:
+                    for member in archive.infolist():
+                        name = os.path.basename(member.filename)
+                        # Skip folders and macOS resource forks
+                        if member.is_dir() or not name.lower().endswith(".pdf") or name.startswith("._"):
+                            continue
+                        if len(documents) >= max_documents:
+                            raise ValueError(f"A batch may contain at most {max_documents} PDFs")
+                        member_path, digest = spool_zip_member(archive, member, min(max_bytes, max_total_bytes - total))
+                        documents.append((f"{filename}/{member.filename}", member_path, digest))
+                        total += os.path.getsize(member_path)
+                discard(path)
+            else:
+                raise ValueError(f"{filename}: only PDF and zip files are supported")
+            if len(documents) > max_documents:
+                raise ValueError(f"A batch may contain at most {max_documents} PDFs")
+            if total > max_total_bytes:
+                raise UploadTooLarge(f"Batch exceeds {max_total_bytes // (1024 * 1024)} MB")
+    except BaseException:
+        for path in {path for _, path, _ in uploads + documents}:
+            discard(path)
+        raise
+    if not documents:
+        raise ValueError("No PDF files found in the upload")
+    return documents
+
+
+def summarize_portfolio(documents: List[Dict[str, Any]], results: Dict[str, Dict[str, Any]], worst: int = 10) -> Dict[str, Any]:
+    """
+    Portfolio view over a batch: per-document scores, the worst clauses across
+    all documents, and risk counts by category and level.
+    `results` maps job_id to that job's final status record.
+    """
+    per_document = []
+    all_risks = []
+    by_category: Counter = Counter()
+    by_level: Counter = Counter()
+    for doc in documents:
+        job = results.get(doc["job_id"]) or {}
+        result = job.get("result") or {}
+        per_document.append({
+            "filename": doc["filename"],
+            "job_id": doc["job_id"],
+            "status": job.get("status", "UNKNOWN"),
+            "risk_score": result.get("risk_score"),
+            "risk_count": len(result.get("risks", [])),
+            "duplicate_of": doc.get("duplicate_of"),
+        })
+        if doc.get("duplicate_of"):
+            continue
+        for risk in result.get("risks", []):
+            by_category[risk.get("clause_type", "Unknown")] += 1
+            by_level[risk.get("risk_level", "Unknown")] += 1
+            all_risks.append({"filename": doc["filename"], "risk_score": result.get("risk_score", 0), **risk})
+
+    all_risks.sort(key=lambda r: (RISK_LEVEL_ORDER.get(r.get("risk_level"), 3), -(r["risk_score"] or 0)))
+    scores = [d["risk_score"] for d in per_document if d["risk_score"] is not None and not d["duplicate_of"]]
+    return {
+        "documents": sorted(per_document, key=lambda d: -(d["risk_score"] or 0)),
+        "average_risk_score": round(sum(scores) / len(scores)) if scores else None,
+        "worst_clauses": all_risks[:worst],
+        "risks_by_category": dict(by_category),
+        "risks_by_level": dict(by_level),
+    }
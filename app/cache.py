@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from app.agents.playbook import playbook_registry
+from app.config import settings
+
+
+def _model_identity() -> str:
+    """Provider/model pair the audit results depend on."""
+    provider = settings.LLM_PROVIDER
+    model = settings.OPENROUTER_MODEL if provider == "openrouter" else settings.MODEL_NAME
+    return f"{provider}:{model}"
+
+
+def make_cache_key(pdf_digest: str) -> str:
+    """
+    Content-addressed key for a full audit result.
+    Combines the uploaded document (its sha256 hex digest), the risk playbook and
+    the configured model, so editing the playbook or switching models never serves stale audits.
+    """
+    parts = [
+        pdf_digest,
+        playbook_registry.get().version,
+        _model_identity(),
+    ]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """SQLite-backed LRU cache of completed audit results, bounded by total payload size."""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS audit_results (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_accessed REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_audit_results_lru ON audit_results (last_accessed)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM audit_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE audit_results SET last_accessed = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        payload = json.dumps(result)
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO audit_results (key, payload, size, created_at, last_accessed)
+                VALUES (?, ?, ?, ?, ?)""",
+                (key, payload, size, now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drops least-recently-used entries until the cache fits in max_bytes."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM audit_results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT key, size FROM audit_results ORDER BY last_accessed ASC"
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM audit_results WHERE key = ?", (key,))
+            total -= size
+
+    def invalidate(self, key: Optional[str] = None) -> int:
+        """Removes one entry, or every entry when no key is given. Returns the count removed."""
+        with self._lock:
+            if key is None:
+                cursor = self._conn.execute("DELETE FROM audit_results")
+            else:
+                cursor = self._conn.execute("DELETE FROM audit_results WHERE key = ?", (key,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM audit_results"
+            ).fetchone()
+        return {"entries": count, "bytes": total, "max_bytes": self.max_bytes}
+
+
+result_cache = ResultCache(
+    settings.RESULT_CACHE_PATH,
+    settings.RESULT_CACHE_MAX_MB * 1024 * 1024,
+) if settings.RESULT_CACHE_ENABLED else None
@@ -1,6 +1,6 @@
 import os
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Dict, List, Optional
 
 class Settings(BaseSettings):
     # API Keys
@@ -11,8 +11,64 @@ class Settings(BaseSettings):
     # LLM Settings
     LLM_PROVIDER: str = "groq" 
     MODEL_NAME: str = "llama-3.3-70b-versatile"
+    # Used when MODEL_NAME is not a Gemini model, e.g. when Google is a fallback provider
+    GOOGLE_MODEL_NAME: str = "gemini-1.5-flash"
     OPENROUTER_MODEL: str = "meta-llama/llama-3.3-70b-instruct:free"
     
+    # Rate Limits (shared by every job in the process, per provider)
+    LLM_RATE_LIMITS: Dict[str, Dict[str, int]] = {
+        "google": {"rpm": 15, "tpm": 1000000},
+        "groq": {"rpm": 30, "tpm": 12000},
+        "openrouter": {"rpm": 20, "tpm": 200000},
+        "fake": {"rpm": 1000000, "tpm": 1000000000},
+    }
+    LLM_COMPLETION_TOKEN_ESTIMATE: int = 1024
+    LLM_MAX_RETRIES: int = 3
+    LLM_DEFAULT_BACKOFF_SECONDS: float = 5.0
+    
+    # LLM Routing (hedge calls slower than the provider's p95, fail over on errors)
+    LLM_ROUTING: bool = True
+    # Tried after LLM_PROVIDER, in order; providers without an API key are skipped
+    LLM_FALLBACK_PROVIDERS: List[str] = ["groq", "openrouter", "google"]
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    LLM_HEALTH_WINDOW: int = 100
+    LLM_COOLDOWN_FAILURES: int = 3
+    LLM_COOLDOWN_SECONDS: float = 30.0
+    
+    # Fake Provider (LLM_PROVIDER=fake: offline, deterministic responses for benchmarks)
+    FAKE_LLM_LATENCY_MS: float = 200.0
+    FAKE_LLM_JITTER_MS: float = 50.0
+    FAKE_LLM_ERROR_RATE: float = 0.0
+    
+    # Clause Extraction (long contracts are split into section-aligned chunks)
+    EXTRACTION_CHUNK_CHARS: int = 24000
+    EXTRACTION_CHUNK_OVERLAP: int = 1500
+    EXTRACTION_MAX_CONCURRENCY: int = 4
+    # Only send passages matching playbook patterns/keywords to the extractor
+    EXTRACTION_PREFILTER: bool = True
+    EXTRACTION_PREFILTER_WINDOW_CHARS: int = 4000
+    # Audit clauses in small batches as they stream out of the extractor
+    AUDIT_PIPELINE: bool = True
+    AUDIT_PIPELINE_BATCH_SIZE: int = 3
+    # First audit pass runs one concurrent call per clause category
+    AUDIT_FAN_OUT: bool = True
+    # Approve without an LLM critic call when the rule-based checks all pass
+    CRITIC_RULES_FAST_PATH: bool = True
+    
+    # PDF Extraction (large PDFs are split into page ranges across processes)
+    PDF_PARALLEL_PAGE_THRESHOLD: int = 100
+    PDF_EXTRACT_WORKERS: int = min(os.cpu_count() or 1, 4)
+    # Strip running headers/footers and page numbers, rejoin wrapped lines
+    PDF_NORMALIZE_LAYOUT: bool = True
+    
+    # Scheduler (bounded pool of concurrent audits, with a priority queue in front)
+    SCHEDULER_WORKERS: int = 4
+    SCHEDULER_MAX_QUEUE: int = 20
+    PROVIDER_MAX_CONCURRENT_JOBS: Dict[str, int] = {"google": 2, "groq": 2, "openrouter": 2}
+    BATCH_MAX_DOCUMENTS: int = 500
+    # Cap on a whole batch after unzipping (each PDF is also capped at UPLOAD_MAX_MB)
+    BATCH_MAX_TOTAL_MB: int = 1024
+    
     # App Settings
     APP_NAME: str = "Contract Auditor"
     DEBUG: bool = False
@@ -21,6 +77,50 @@ class Settings(BaseSettings):
     BASE_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     RISK_PLAYBOOK_PATH: str = os.path.join(BASE_DIR, "data", "risk_standards.json")
     
+    # Result Cache (repeat uploads of the same document skip the pipeline)
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_PATH: str = os.path.join(BASE_DIR, "cache", "results.db")
+    RESULT_CACHE_MAX_MB: int = 64
+    
+    # Clause Cache (reuses findings for repeated or near-identical boilerplate clauses)
+    CLAUSE_CACHE_ENABLED: bool = True
+    CLAUSE_CACHE_PATH: str = os.path.join(BASE_DIR, "cache", "clauses.db")
+    CLAUSE_CACHE_SIMILARITY: float = 0.9
+    CLAUSE_CACHE_MAX_ENTRIES: int = 20000
+    
+    # Job Store ("memory" per process, or "sqlite" shared by all gunicorn workers)
+    JOB_STORE_BACKEND: str = "memory"
+    JOB_STORE_PATH: str = os.path.join(BASE_DIR, "cache", "jobs.db")
+    JOB_TTL_SECONDS: int = 3600
+    JOB_STORE_MAX_JOBS: int = 500
+    
+    # Checkpoints (graph state saved after every node, per job, so failed or orphaned jobs resume)
+    CHECKPOINT_ENABLED: bool = True
+    CHECKPOINT_PATH: str = os.path.join(BASE_DIR, "cache", "checkpoints.db")
+    # Resume jobs whose worker died mid-run (e.g. killed on gunicorn's timeout) at startup
+    CHECKPOINT_AUTO_RESUME: bool = True
+    
+    # Status Streams
+    SSE_HEARTBEAT_SECONDS: float = 15.0
+    SSE_SHARED_POLL_SECONDS: float = 1.0
+    
+    # Cold start: build the agent graph and model client in the background once the server is up
+    # (set STARTUP_REPORT=1 in the environment for an import-time breakdown)
+    PREWARM: bool = True
+    
+    # Metrics (GET /metrics; optionally a per-job span trace in the job result)
+    METRICS_JOB_TRACE: bool = False
+    
+    # Uploads
+    UPLOAD_MAX_MB: int = 50
+    UPLOAD_SPOOL_DIR: str = os.path.join(BASE_DIR, "cache", "uploads")
+    
+    # Low-memory mode (small instances): uploads spooled to disk, buffers released early,
+    # finished results compressed, and jobs admitted against a per-worker memory budget
+    LOW_MEMORY_MODE: bool = False
+    LOW_MEMORY_BUDGET_MB: float = 400.0
+    LOW_MEMORY_JOB_OVERHEAD_MB: float = 40.0
+    
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 settings = Settings()
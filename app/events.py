@@ -0,0 +1,38 @@
+import asyncio
+import weakref
+
+
+class JobEvents:
+    """
+    Per-job change notification for SSE subscribers in this process.
+    Each publish wakes every current subscriber once; later subscribers get a fresh event.
+    """
+
+    def __init__(self):
+        # Entries vanish once no subscriber holds the event any more
+        self._events: "weakref.WeakValueDictionary[str, asyncio.Event]" = weakref.WeakValueDictionary()
+
+    def subscribe(self, job_id: str) -> asyncio.Event:
+        """Call before reading the job, so a change made in between is not missed."""
+        event = self._events.get(job_id)
+        if event is None:
+            event = asyncio.Event()
+            self._events[job_id] = event
+        return event
+
+    def publish(self, job_id: str) -> None:
+        event = self._events.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    @staticmethod
+    async def wait(event: asyncio.Event, timeout: float) -> bool:
+        """Waits for the next publish; False if `timeout` passed first."""
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+job_events = JobEvents()
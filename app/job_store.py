@@ -0,0 +1,221 @@
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from app.config import settings
+
+FINISHED_STATUSES = ("COMPLETED", "FAILED", "CANCELLED")
+
+
+def compress_result(result: Any) -> str:
+    return base64.b64encode(zlib.compress(json.dumps(result).encode("utf-8"), 6)).decode("ascii")
+
+
+def decompress_result(blob: str) -> Any:
+    return json.loads(zlib.decompress(base64.b64decode(blob)))
+
+
+class JobStore(ABC):
+    """
+    Where job status and results live between the pipeline and /status readers.
+    Every update bumps the job's "event_id", which SSE streams use as the event id.
+    With compress_results, a job's "result" is kept zlib-compressed and inflated on read.
+    """
+
+    compress_results = False
+
+    def _pack(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.compress_results or fields.get("result") is None:
+            return fields
+        packed = dict(fields)
+        packed["result_compressed"] = compress_result(packed.pop("result"))
+        packed["result"] = None
+        return packed
+
+    def _unpack(self, job: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if job and job.get("result_compressed"):
+            job["result"] = decompress_result(job.pop("result_compressed"))
+        return job
+
+    @abstractmethod
+    def create(self, job_id: str, job: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def update(self, job_id: str, fields: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, job_id: str) -> None:
+        ...
+
+    def __contains__(self, job_id: str) -> bool:
+        return self.get(job_id) is not None
+
+
+class InMemoryJobStore(JobStore):
+    """
+    Per-process store. Finished jobs expire `ttl` seconds after their last update,
+    and the least-recently-updated finished jobs are evicted beyond `max_jobs`.
+    Queued and running jobs are never dropped, so a large batch can exceed `max_jobs`.
+    """
+
+    def __init__(self, ttl: float, max_jobs: int):
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._updated: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _touch(self, job_id: str) -> None:
+        self._jobs.move_to_end(job_id)
+        self._updated[job_id] = time.monotonic()
+
+    def _expired(self, job_id: str, cutoff: float) -> bool:
+        return self._updated[job_id] < cutoff and self._jobs[job_id].get("status") in FINISHED_STATUSES
+
+    def _evict(self) -> None:
+        cutoff = time.monotonic() - self.ttl
+        for job_id in [j for j in self._jobs if self._expired(j, cutoff)]:
+            self._remove(job_id)
+        if len(self._jobs) <= self.max_jobs:
+            return
+        finished = [j for j, job in self._jobs.items() if job.get("status") in FINISHED_STATUSES]
+        for job_id in finished:
+            if len(self._jobs) <= self.max_jobs:
+                break
+            self._remove(job_id)
+
+    def _remove(self, job_id: str) -> None:
+        self._jobs.pop(job_id, None)
+        self._updated.pop(job_id, None)
+
+    def create(self, job_id: str, job: Dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs[job_id] = dict(self._pack(job))
+            self._touch(job_id)
+            self._evict()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if job_id not in self._jobs:
+                return None
+            if self._expired(job_id, time.monotonic() - self.ttl):
+                self._remove(job_id)
+                return None
+            job = dict(self._jobs[job_id])
+        return self._unpack(job)
+
+    def update(self, job_id: str, fields: Dict[str, Any]) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                job = self._jobs[job_id]
+                job.update(self._pack(fields))
+                job["event_id"] = job.get("event_id", 0) + 1
+                self._touch(job_id)
+
+    def delete(self, job_id: str) -> None:
+        with self._lock:
+            self._remove(job_id)
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Store shared by every worker process on the host (SQLite in WAL mode),
+    so /status can be served by a different gunicorn worker than the one running the job.
+    As in the in-memory store, only finished jobs expire; queued and running ones never do.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT '',
+                updated_at REAL NOT NULL
+            )"""
+        )
+        if "status" not in [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]:
+            # Databases from before the status column: backfill it from the job data
+            conn.execute("ALTER TABLE jobs ADD COLUMN status TEXT NOT NULL DEFAULT ''")
+            conn.execute("UPDATE jobs SET status = COALESCE(json_extract(data, '$.status'), '')")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs (updated_at)")
+        conn.commit()
+
+    def _expired(self) -> Tuple[str, tuple]:
+        """SQL condition (and its parameters) matching finished jobs past the TTL."""
+        placeholders = ", ".join("?" for _ in FINISHED_STATUSES)
+        return f"updated_at < ? AND status IN ({placeholders})", (time.time() - self.ttl, *FINISHED_STATUSES)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; pipeline work runs in threads as well as the event loop
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, job_id: str, job: Dict[str, Any]) -> None:
+        conn = self._conn()
+        with conn:
+            expired, params = self._expired()
+            conn.execute(f"DELETE FROM jobs WHERE {expired}", params)
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, data, status, updated_at) VALUES (?, ?, ?, ?)",
+                (job_id, json.dumps(self._pack(job)), job.get("status") or "", time.time()),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        expired, params = self._expired()
+        row = self._conn().execute(
+            f"SELECT data FROM jobs WHERE job_id = ? AND NOT ({expired})",
+            (job_id, *params),
+        ).fetchone()
+        return self._unpack(json.loads(row[0])) if row else None
+
+    def update(self, job_id: str, fields: Dict[str, Any]) -> None:
+        conn = self._conn()
+        with conn:
+            # BEGIN IMMEDIATE takes the write lock up front so read-modify-write is atomic across workers
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            job = json.loads(row[0])
+            job.update(self._pack(fields))
+            job["event_id"] = job.get("event_id", 0) + 1
+            conn.execute(
+                "UPDATE jobs SET data = ?, status = ?, updated_at = ? WHERE job_id = ?",
+                (json.dumps(job), job.get("status") or "", time.time(), job_id),
+            )
+
+    def delete(self, job_id: str) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+
+def create_job_store() -> JobStore:
+    if settings.JOB_STORE_BACKEND == "sqlite":
+        store = SQLiteJobStore(settings.JOB_STORE_PATH, settings.JOB_TTL_SECONDS)
+    else:
+        store = InMemoryJobStore(settings.JOB_TTL_SECONDS, settings.JOB_STORE_MAX_JOBS)
+    store.compress_results = settings.LOW_MEMORY_MODE
+    return store
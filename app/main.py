@@ -1,15 +1,81 @@
+from app import startup
 import uuid
 import asyncio
-from fastapi import FastAPI, UploadFile, File, BackgroundTasks, HTTPException
+import functools
+import hashlib
+import os
+from contextlib import aclosing, asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, BackgroundTasks, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
-from app.pdf_processor import extract_text_from_pdf
-from app.agents.graph import create_graph
+from app.pdf_processor import extract_document_from_pdf
 from app.models import ContractState
+from app.cache import make_cache_key, result_cache
+from app.agents.clause_cache import clause_cache
+from app.batch import expand_uploads, summarize_portfolio
+from app.job_store import create_job_store, InMemoryJobStore, FINISHED_STATUSES
+from app.events import job_events
+from app.scheduler import scheduler, QueueFullError, PRIORITIES
+from app.uploads import spool_upload, discard, sweep_spool, UploadTooLarge
+from app.memory import memory_budget
+from app.config import settings
+from app import metrics
+from typing import Dict, List, Optional, Tuple, Union
 import json
 
-app = FastAPI(title="Contract Auditor API")
+_graph_ready: Optional[asyncio.Future] = None
+
+def _warm_up():
+    """Imports the agents and provider SDK, compiles the graph and builds the model client."""
+    from app.agents.graph import get_graph
+    from app.agents.utils import get_llm
+    graph = get_graph()
+    startup.mark("graph compiled")
+    get_llm()
+    startup.mark("model client ready")
+    return graph
+
+async def load_graph():
+    """
+    The compiled agent graph, built once per worker in a thread so the event loop
+    keeps serving; callers arriving during the prewarm wait for it instead of importing twice.
+    """
+    global _graph_ready
+    if _graph_ready is None:
+        _graph_ready = asyncio.ensure_future(asyncio.to_thread(_warm_up))
+    ready = _graph_ready
+    try:
+        return await asyncio.shield(ready)
+    except Exception:
+        # Let the next job try again rather than failing every job on one bad start
+        if _graph_ready is ready:
+            _graph_ready = None
+        raise
+
+async def prewarm():
+    try:
+        await load_graph()
+    except Exception as e:
+        print(f"Prewarm failed, the first audit will retry: {e}")
+    startup.report()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup.mark("lifespan started")
+    if settings.PREWARM:
+        # Not awaited: startup finishes and the server starts listening while imports run in a thread
+        app.state.prewarm = asyncio.create_task(prewarm())
+    if settings.LOW_MEMORY_MODE:
+        # Spooled uploads of jobs that died with a previous worker
+        sweep_spool(settings.JOB_TTL_SECONDS)
+    scheduler.start()
+    if settings.CHECKPOINT_ENABLED and settings.CHECKPOINT_AUTO_RESUME:
+        app.state.resume = asyncio.create_task(resume_orphaned_jobs())
+    yield
+    await scheduler.stop()
+
+app = FastAPI(title="Contract Auditor API", lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -19,56 +85,354 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory storage for job status (Simple for production-ready demo)
-# For Render free tier, this works within memory limits for single instances
-jobs = {}
+# Job status storage: in-memory with TTL eviction by default,
+# or SQLite (JOB_STORE_BACKEND=sqlite) when several gunicorn workers share jobs
+jobs = create_job_store()
+
+# job_id -> spooled upload (low-memory mode and batches), deleted once the PDF has been read
+spooled_uploads: Dict[str, str] = {}
+
+def release_upload(job_id: str):
+    path = spooled_uploads.pop(job_id, None)
+    if path:
+        discard(path)
+
+def update_job(job_id: str, fields: dict):
+    """Applies a status change and wakes this job's SSE subscribers."""
+    jobs.update(job_id, fields)
+    job_events.publish(job_id)
+    if fields.get("status") in FINISHED_STATUSES:
+        metrics.jobs_finished.inc(fields["status"])
 
 @app.get("/health")
 def health():
     return {"status": "healthy"}
 
-@app.post("/audit")
-async def start_audit(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
-    if not file.filename.endswith('.pdf'):
-        raise HTTPException(status_code=400, detail="Only PDF files are supported")
-    
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus scrape endpoint for stage, LLM call and job metrics."""
+    return PlainTextResponse(metrics.render_metrics(), media_type="text/plain; version=0.0.4")
+
+def is_cancelled(job_id: str) -> bool:
+    """Cancellation is recorded in the job store, so it works across workers."""
+    job = jobs.get(job_id)
+    return job is None or job["status"] == "CANCELLED"
+
+def create_audit_job(digest: str, use_cache: bool = True) -> Tuple[str, Optional[str], bool]:
+    """
+    Registers a job for a document (by its sha256 digest), completing it
+    straight from the result cache when possible. Returns (job_id, cache_key, cached).
+    """
     job_id = str(uuid.uuid4())
-    content = await file.read()
     
-    jobs[job_id] = {
+    # Identical document + playbook + model: serve the stored audit immediately
+    cache_key = make_cache_key(digest) if result_cache and use_cache else None
+    cached_result = result_cache.get(cache_key) if result_cache else None
+    if cached_result is not None:
+        jobs.create(job_id, {
+            "status": "COMPLETED",
+            "progress": 100,
+            "message": "Audit Complete! (cached)",
+            "result": cached_result
+        })
+        metrics.jobs_finished.inc("COMPLETED")
+        return job_id, cache_key, True
+    
+    jobs.create(job_id, {
         "status": "QUEUED",
         "progress": 0,
         "message": "Initializing...",
         "result": None
-    }
+    })
+    return job_id, cache_key, False
+
+async def wait_for_job(job_id: str) -> Optional[dict]:
+    """Waits until a job finishes (or disappears) and returns its final record."""
+    while True:
+        event = job_events.subscribe(job_id)
+        job = jobs.get(job_id)
+        if job is None or job["status"] in FINISHED_STATUSES:
+            return job
+        await job_events.wait(event, settings.SSE_HEARTBEAT_SECONDS)
+
+def previous_version(job_id: str) -> dict:
+    """The completed result a revision upload is diffed against."""
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Previous job not found (it may have expired)")
+    if job["status"] != "COMPLETED" or not job.get("result"):
+        raise HTTPException(status_code=409, detail=f"Previous job is {job['status'].lower()}, not completed")
+    if "clauses" not in job["result"]:
+        raise HTTPException(status_code=409, detail="Previous job has no clause data to diff against; audit it again")
+    return job["result"]
+
+@app.post("/audit")
+async def start_audit(file: UploadFile = File(...), priority: str = "interactive", previous_job_id: Optional[str] = None):
+    """
+    Queues an audit. With `previous_job_id` the upload is treated as a new version of
+    that job's contract: unchanged clauses keep their findings, only changes are re-audited.
+    """
+    if not file.filename.endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported")
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"priority must be one of {list(PRIORITIES)}")
+    previous = previous_version(previous_job_id) if previous_job_id else None
+    
+    if memory_budget and memory_budget.over_budget():
+        raise HTTPException(status_code=503, detail="Server is at its memory budget", headers={"Retry-After": str(scheduler.retry_after())})
     
-    background_tasks.add_task(run_audit_pipeline, job_id, content)
+    max_bytes = settings.UPLOAD_MAX_MB * 1024 * 1024
+    try:
+        if settings.LOW_MEMORY_MODE:
+            # Stream to disk; the pipeline opens the PDF from the file
+            source, digest = await spool_upload(file, max_bytes)
+        else:
+            source = await file.read()
+            if len(source) > max_bytes:
+                raise UploadTooLarge(f"Upload exceeds {settings.UPLOAD_MAX_MB} MB")
+            digest = hashlib.sha256(source).hexdigest()
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     
-    return {"job_id": job_id}
+    # A revision's report is tied to its previous version, so it bypasses the result cache
+    job_id, cache_key, cached = create_audit_job(digest, use_cache=previous is None)
+    if cached:
+        if isinstance(source, str):
+            discard(source)
+        return {"job_id": job_id, "cached": True}
+    if isinstance(source, str):
+        spooled_uploads[job_id] = source
+    
+    try:
+        scheduler.submit(
+            job_id,
+            lambda: run_audit_pipeline(job_id, source, cache_key, previous=previous),
+            settings.LLM_PROVIDER,
+            priority
+        )
+    except QueueFullError as e:
+        jobs.delete(job_id)
+        release_upload(job_id)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    
+    return {"job_id": job_id, "cached": False}
 
-async def run_audit_pipeline(job_id: str, pdf_content: bytes):
+@app.post("/audit/batch")
+async def start_batch_audit(background_tasks: BackgroundTasks, files: List[UploadFile] = File(...)):
+    """
+    Audits a portfolio of PDFs (uploaded directly and/or as zip archives).
+    Identical documents are audited once; progress and the final portfolio
+    summary are streamed from /status/{batch_id}.
+    """
+    # Every file, and every PDF inside a zip, goes to disk under the same size caps as /audit
+    max_bytes = settings.UPLOAD_MAX_MB * 1024 * 1024
+    max_total_bytes = settings.BATCH_MAX_TOTAL_MB * 1024 * 1024
+    uploads = []
     try:
-        jobs[job_id].update({"status": "PROCESSING", "progress": 10, "message": "Agent 1: Extracting Clauses..."})
+        for file in files:
+            if not file.filename.lower().endswith((".pdf", ".zip")):
+                raise ValueError(f"{file.filename}: only PDF and zip files are supported")
+            is_zip = file.filename.lower().endswith(".zip")
+            path, digest = await spool_upload(file, max_total_bytes if is_zip else max_bytes, ".zip" if is_zip else ".pdf")
+            uploads.append((file.filename, path, digest))
+        documents = expand_uploads(uploads, settings.BATCH_MAX_DOCUMENTS, max_bytes, max_total_bytes)
+    except (ValueError, UploadTooLarge) as e:
+        for _, path, _ in uploads:
+            discard(path)
+        raise HTTPException(status_code=413 if isinstance(e, UploadTooLarge) else 400, detail=str(e))
+    
+    entries, pending, seen = [], [], {}
+    for filename, path, digest in documents:
+        if digest in seen:
+            discard(path)
+            first = seen[digest]
+            entries.append({"filename": filename, "job_id": first["job_id"], "duplicate_of": first["filename"]})
+            continue
+        job_id, cache_key, cached = create_audit_job(digest)
+        entry = {"filename": filename, "job_id": job_id, "duplicate_of": None}
+        seen[digest] = entry
+        entries.append(entry)
+        if cached:
+            discard(path)
+        else:
+            spooled_uploads[job_id] = path
+            pending.append((job_id, path, cache_key))
+    
+    batch_id = str(uuid.uuid4())
+    jobs.create(batch_id, {
+        "status": "PROCESSING",
+        "progress": 0,
+        "message": f"0/{len(seen)} documents audited",
+        "result": None,
+        "documents": entries
+    })
+    background_tasks.add_task(run_batch, batch_id, entries, pending)
+    
+    return {"batch_id": batch_id, "documents": entries}
+
+async def run_batch(batch_id: str, documents: List[dict], pending: List[tuple]):
+    """Feeds a batch's documents to the scheduler as bulk work and aggregates their progress."""
+    job_ids = list(dict.fromkeys(doc["job_id"] for doc in documents))
+    results = {}
+    
+    async def track(job_id: str):
+        results[job_id] = await wait_for_job(job_id)
+        if not is_cancelled(batch_id):
+            update_job(batch_id, {
+                "progress": round(100 * len(results) / len(job_ids)),
+                "message": f"{len(results)}/{len(job_ids)} documents audited"
+            })
+    
+    trackers = [asyncio.create_task(track(job_id)) for job_id in job_ids]
+    
+    # Submit in upload order, releasing each document's bytes once it's queued
+    pending.reverse()
+    while pending:
+        if is_cancelled(batch_id):
+            break
+        job_id, content, cache_key = pending.pop()
+        await scheduler.submit_when_ready(
+            job_id,
+            functools.partial(run_audit_pipeline, job_id, content, cache_key),
+            settings.LLM_PROVIDER,
+            "bulk"
+        )
+    
+    if is_cancelled(batch_id):
+        for job_id in job_ids:
+            job = jobs.get(job_id)
+            if job and job["status"] not in FINISHED_STATUSES:
+                scheduler.drop(job_id)
+                if job["status"] == "QUEUED":
+                    release_upload(job_id)
+                update_job(job_id, {"status": "CANCELLED", "message": "Batch cancelled"})
+    
+    await asyncio.gather(*trackers)
+    if is_cancelled(batch_id):
+        return
+    
+    update_job(batch_id, {
+        "status": "COMPLETED",
+        "progress": 100,
+        "message": "Batch Audit Complete!",
+        "result": summarize_portfolio(documents, results)
+    })
+
+@app.delete("/audit/{job_id}")
+def cancel_audit(job_id: str):
+    """Cancels a queued job, or stops a running one before its next graph node."""
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] in FINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job already {job['status'].lower()}")
+    scheduler.drop(job_id)
+    if job["status"] == "QUEUED":
+        # A running pipeline still needs its spooled PDF; it removes the file itself
+        release_upload(job_id)
+    update_job(job_id, {"status": "CANCELLED", "message": "Audit cancelled"})
+    return {"job_id": job_id, "status": "CANCELLED"}
+
+@app.delete("/cache")
+def invalidate_cache(key: Optional[str] = None):
+    """Drops a single cached audit result, or the whole cache when no key is given."""
+    if not result_cache:
+        raise HTTPException(status_code=404, detail="Result cache is disabled")
+    return {"invalidated": result_cache.invalidate(key)}
+
+@app.delete("/cache/clauses")
+def invalidate_clause_cache():
+    if not clause_cache:
+        raise HTTPException(status_code=404, detail="Clause cache is disabled")
+    return {"invalidated": clause_cache.invalidate()}
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Entry counts and hit rates for the result and clause caches."""
+    return {
+        "results": result_cache.stats() if result_cache else None,
+        "clauses": clause_cache.stats() if clause_cache else None
+    }
+
+async def run_audit_pipeline(job_id: str, pdf: Union[bytes, str], cache_key: Optional[str] = None, config: Optional[dict] = None, previous: Optional[dict] = None):
+    """
+    Audits a PDF given as bytes or as a spooled file path, within the memory budget if one is set.
+    `previous` is the result of the audit of an earlier version of the same contract, if any.
+    """
+    try:
+        if memory_budget:
+            size = os.path.getsize(pdf) if isinstance(pdf, str) else len(pdf)
+            async with memory_budget.reserve(memory_budget.estimate_mb(size)):
+                await _run_pipeline(job_id, pdf, cache_key, config, previous)
+        else:
+            await _run_pipeline(job_id, pdf, cache_key, config, previous)
+    finally:
+        release_upload(job_id)
+
+async def _run_pipeline(job_id: str, pdf: Union[bytes, str], cache_key: Optional[str], config: Optional[dict], previous: Optional[dict]):
+    if is_cancelled(job_id):
+        return
+    trace = metrics.start_trace()
+    try:
+        update_job(job_id, {"status": "PROCESSING", "progress": 10, "message": "Agent 1: Extracting Clauses..."})
         
         # 1. Extract Text
-        text = extract_text_from_pdf(pdf_content)
-        if not text:
-            jobs[job_id].update({"status": "FAILED", "message": "Failed to extract text from PDF"})
+        with metrics.span("pdf_extraction"):
+            document = await asyncio.to_thread(extract_document_from_pdf, pdf)
+        release_upload(job_id)
+        if not document.text:
+            update_job(job_id, {"status": "FAILED", "message": "Failed to extract text from PDF"})
             return
             
         # 2. Run LangGraph with streaming status updates
-        graph = create_graph()
-        initial_state = {
-            "document_text": text,
+        graph = await load_graph()
+        graph_input = {
+            "document_text": document.text,
+            "page_offsets": document.page_offsets,
+            "previous_clauses": previous["clauses"] if previous else [],
+            "previous_risks": previous["risks"] if previous else [],
+            "previous_sections": previous.get("sections", []) if previous else [],
             "clauses": [],
+            "sections": [],
+            "prefetched_risks": {},
+            "category_findings": {},
             "risks": [],
             "risk_score": 0,
             "critic_approved": False,
             "critic_feedback": None,
+            "rejected_risks": [],
+            "recheck_clauses": [],
             "loop_count": 0,
+            "revision": None,
             "report": ""
         }
-        
+        del document
+        final_state = {k: v for k, v in graph_input.items() if k != "document_text"}
+        # _run_graph empties graph_input once the graph has taken it in, so from then on the
+        # graph state holds the only copy of the text (and drops it after extraction in low-memory mode)
+        await _run_graph(job_id, graph, graph_input, final_state, cache_key, config, trace)
+    except Exception as e:
+        print(f"Audit Pipeline Error: {e}")
+        update_job(job_id, {"status": "FAILED", "message": str(e)})
+
+async def _run_graph(job_id: str, graph, graph_input: Optional[dict], final_state: dict, cache_key: Optional[str], config: Optional[dict], trace: list, claimed: bool = False):
+    """
+    Streams the graph (from `graph_input`, or from the job's last checkpoint when it's None)
+    and completes the job. Checkpoints are kept if the run fails, so it can be resumed.
+    Takes ownership of `graph_input`: it is cleared once the first node has run.
+    `claimed`: the caller already claimed the job's thread. If the claim fails, another
+    worker is running the job and its status is left alone.
+    """
+    saver = graph.checkpointer
+    # Thread per job; the cache key is stored in checkpoint metadata for resumed runs
+    config = dict(config or {})
+    config["configurable"] = {**config.get("configurable", {}), "thread_id": job_id, "cache_key": cache_key or ""}
+    if saver and not claimed and not saver.claim(job_id):
+        print(f"Audit {job_id} is already running on another worker")
+        return
+    
+    finished = interrupted = False
+    try:
         node_status_map = {
             "extract_clauses": (25, "Agent 1: Clause Context Extracted"),
             "audit_risks": (50, "Agent 2: Audit vs Risk Standards Complete"),
@@ -76,59 +440,197 @@ async def run_audit_pipeline(job_id: str, pdf_content: bytes):
             "generate_report": (95, "Finalizing Multimodal Report...")
         }
 
-        final_state = initial_state
         # Run graph in streaming mode to update progress as each node finishes
-        for output in graph.stream(initial_state):
-            for node_name, state_update in output.items():
-                if node_name in node_status_map:
-                    progress, message = node_status_map[node_name]
-                    # If it's a loop back to audit, customize message
-                    if node_name == "audit_risks" and final_state.get("loop_count", 0) > 0:
-                        message = f"Agent 2: Re-Auditing (Loop {final_state['loop_count'] + 1})..."
+        async with aclosing(graph.astream(graph_input, config=config)) as stream:
+            async for output in stream:
+                if graph_input:
+                    # The graph's channels have their own references by now
+                    graph_input.clear()
+                # Stop between nodes if the job was cancelled while the last one ran
+                if is_cancelled(job_id):
+                    return
+                for node_name, state_update in output.items():
+                    if node_name in node_status_map:
+                        progress, message = node_status_map[node_name]
+                        # If it's a loop back to audit, customize message
+                        if node_name == "audit_risks" and final_state.get("loop_count", 0) > 0:
+                            message = f"Agent 2: Re-Auditing (Loop {final_state['loop_count'] + 1})..."
                     
-                    jobs[job_id].update({"progress": progress, "message": message})
-                    # Update local state so we have the latest for the final report
-                    final_state.update(state_update)
+                        update_job(job_id, {"progress": progress, "message": message})
+                        # Update local state so we have the latest for the final report
+                        final_state.update(state_update)
 
-        jobs[job_id].update({
+        if is_cancelled(job_id):
+            return
+        result = {
+            "risk_score": final_state["risk_score"],
+            "report": final_state["report"],
+            "risks": final_state["risks"],
+            # Kept so a later version of this contract can be diffed against it
+            "clauses": final_state["clauses"],
+            "sections": final_state.get("sections", []),
+            "revision": final_state.get("revision")
+        }
+        if result_cache and cache_key:
+            result_cache.put(cache_key, result)
+        metrics.critic_loops.observe(final_state.get("loop_count", 0))
+        if settings.METRICS_JOB_TRACE:
+            # Added after caching so a cache hit never replays another job's timings
+            result = {**result, "trace": trace}
+
+        update_job(job_id, {
             "status": "COMPLETED",
             "progress": 100,
             "message": "Audit Complete!",
-            "result": {
-                "risk_score": final_state["risk_score"],
-                "report": final_state["report"],
-                "risks": final_state["risks"]
-            }
+            "result": result
         })
+        finished = True
+    except asyncio.CancelledError:
+        # Not a user cancel: the worker is shutting down mid-run
+        interrupted = not is_cancelled(job_id)
+        raise
+    finally:
+        if saver:
+            if finished or is_cancelled(job_id):
+                saver.finish(job_id)
+            elif interrupted and settings.CHECKPOINT_AUTO_RESUME:
+                saver.detach(job_id)
+                update_job(job_id, {"status": "QUEUED", "message": "Interrupted by a restart; resumes from its checkpoint"})
+            else:
+                saver.release(job_id)
+                if interrupted:
+                    update_job(job_id, {"status": "FAILED", "message": "Interrupted by a restart; resume it from its checkpoint"})
+
+async def _checkpoint(job_id: str):
+    """The job's latest graph checkpoint, or None if there is nothing left to run."""
+    graph = await load_graph()
+    if not graph.checkpointer:
+        return None
+    snapshot = await graph.aget_state({"configurable": {"thread_id": job_id}})
+    return snapshot if snapshot.next else None
+
+async def resume_audit_pipeline(job_id: str):
+    """Continues a job from its last checkpoint: completed nodes, PDF extraction included, are not re-run."""
+    if memory_budget:
+        async with memory_budget.reserve(memory_budget.estimate_mb(0)):
+            await _resume_pipeline(job_id)
+    else:
+        await _resume_pipeline(job_id)
+
+async def _resume_pipeline(job_id: str):
+    graph = await load_graph()
+    saver = graph.checkpointer
+    job = jobs.get(job_id)
+    if job is None or job["status"] in FINISHED_STATUSES:
+        # Cancelled while queued, or finished some other way in the meantime
+        if job and job["status"] == "FAILED":
+            saver.release(job_id)
+        else:
+            saver.finish(job_id)
+        return
+    if not saver.claim(job_id):
+        # Another worker is resuming it; that run owns the job's status
+        print(f"Audit {job_id} is already running on another worker")
+        return
+    trace = metrics.start_trace()
+    try:
+        snapshot = await _checkpoint(job_id)
+        if snapshot is None:
+            saver.finish(job_id)
+            update_job(job_id, {"status": "FAILED", "message": "Nothing to resume; upload the document again"})
+            return
+        update_job(job_id, {"status": "PROCESSING", "message": f"Resuming at {', '.join(snapshot.next)}..."})
+        await _run_graph(job_id, graph, None, dict(snapshot.values), snapshot.metadata.get("cache_key") or None, None, trace, claimed=True)
     except Exception as e:
         print(f"Audit Pipeline Error: {e}")
-        jobs[job_id].update({"status": "FAILED", "message": str(e)})
+        saver.release(job_id)
+        update_job(job_id, {"status": "FAILED", "message": str(e)})
+
+def _requeue(job_id: str, job: Optional[dict]):
+    """Puts a job back in QUEUED, recreating its record if this worker's store never had it."""
+    fields = {"status": "QUEUED", "message": "Queued to resume from checkpoint"}
+    if job is None:
+        jobs.create(job_id, {**fields, "progress": 0, "result": None})
+    else:
+        update_job(job_id, fields)
+
+@app.post("/audit/{job_id}/resume")
+async def resume_audit(job_id: str, priority: str = "interactive"):
+    """Re-runs a failed or orphaned job from its last checkpoint instead of from the upload."""
+    if not settings.CHECKPOINT_ENABLED:
+        raise HTTPException(status_code=404, detail="Checkpoints are disabled")
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"priority must be one of {list(PRIORITIES)}")
+    job = jobs.get(job_id)
+    if job and job["status"] in ("COMPLETED", "CANCELLED", "QUEUED"):
+        raise HTTPException(status_code=409, detail=f"Job is {job['status'].lower()}")
+    graph = await load_graph()
+    if await _checkpoint(job_id) is None:
+        raise HTTPException(status_code=404, detail="No checkpoint to resume from; upload the document again")
+    # A PROCESSING job no live worker owns was interrupted or orphaned
+    if not graph.checkpointer.adopt(job_id):
+        raise HTTPException(status_code=409, detail="Job is still running")
+    
+    _requeue(job_id, job)
+    try:
+        scheduler.submit(job_id, lambda: resume_audit_pipeline(job_id), settings.LLM_PROVIDER, priority)
+    except QueueFullError as e:
+        graph.checkpointer.release(job_id)
+        update_job(job_id, {"status": "FAILED", "message": "Resume refused: queue is full"})
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    return {"job_id": job_id, "status": "QUEUED"}
+
+async def resume_orphaned_jobs():
+    """Requeues jobs whose worker died mid-run (e.g. killed on gunicorn's timeout) from their checkpoints."""
+    try:
+        graph = await load_graph()
+        saver = graph.checkpointer
+        for job_id in saver.orphaned():
+            # Every starting worker sees the same orphans; only the one that adopts it queues it
+            if not saver.adopt(job_id):
+                continue
+            job = jobs.get(job_id)
+            if (job and job["status"] in FINISHED_STATUSES) or await _checkpoint(job_id) is None:
+                saver.finish(job_id)
+                continue
+            print(f"Resuming orphaned audit {job_id}")
+            _requeue(job_id, job)
+            await scheduler.submit_when_ready(job_id, functools.partial(resume_audit_pipeline, job_id), settings.LLM_PROVIDER, "bulk")
+    except Exception as e:
+        print(f"Resuming orphaned audits failed: {e}")
 
 @app.get("/status/{job_id}")
-async def get_status(job_id: str):
+async def get_status(job_id: str, last_event_id: Optional[int] = Header(None)):
     if job_id not in jobs:
         raise HTTPException(status_code=404, detail="Job not found")
+    
+    # Another worker's updates can't wake us, so a shared store is re-read on a short timer
+    idle_timeout = settings.SSE_HEARTBEAT_SECONDS if isinstance(jobs, InMemoryJobStore) else settings.SSE_SHARED_POLL_SECONDS
         
     async def event_stream():
-        last_progress = -1
-        last_message = ""
+        last_sent = last_event_id if last_event_id is not None else -1
+        idle = 0.0
         while True:
+            event = job_events.subscribe(job_id)
             job = jobs.get(job_id)
             if not job:
                 break
+            
+            event_id = job.get("event_id", 0)
+            if event_id > last_sent:
+                yield f"id: {event_id}\ndata: {json.dumps(job)}\n\n"
+                last_sent = event_id
+                idle = 0.0
                 
-            # Only send if something changed or it's finished
-            # CRITICAL FIX: Also check for message changes to keep user engaged
-            if job["progress"] != last_progress or job["message"] != last_message or job["status"] in ["COMPLETED", "FAILED"]:
-                yield f"data: {json.dumps(job)}\n\n"
-                print(f"SSE [{job_id}]: {job['message']} ({job['progress']}%)")
-                last_progress = job["progress"]
-                last_message = job["message"]
-                
-            if job["status"] in ["COMPLETED", "FAILED"]:
+            if job["status"] in FINISHED_STATUSES:
                 break
-                
-            await asyncio.sleep(0.5) # Poll faster for a more "live" feel
+            
+            # Sleep until the pipeline publishes a change; heartbeat only when idle
+            if not await job_events.wait(event, idle_timeout):
+                idle += idle_timeout
+                if idle >= settings.SSE_HEARTBEAT_SECONDS:
+                    yield ": keep-alive\n\n"
+                    idle = 0.0
             
     return StreamingResponse(
         event_stream(), 
@@ -142,3 +644,5 @@ async def get_status(job_id: str):
 
 # Serve static frontend
 app.mount("/", StaticFiles(directory="frontend", html=True), name="frontend")
+
+startup.mark("app imported")
@@ -0,0 +1,60 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from app.config import settings
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process; 0 where /proc isn't available (no gating)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / (1024 * 1024)
+    except (OSError, IndexError, ValueError):
+        return 0.0
+
+
+class MemoryBudget:
+    """
+    Admission control against a per-worker memory ceiling.
+    Uploads are refused while RSS is already over budget, and a job only starts
+    once its estimated footprint fits next to what is already resident.
+    One job is always allowed to run, so a single large PDF can't wait forever.
+    """
+
+    def __init__(self, budget_mb: float, job_overhead_mb: float, poll_seconds: float = 0.5):
+        self.budget_mb = budget_mb
+        self.job_overhead_mb = job_overhead_mb
+        self.poll_seconds = poll_seconds
+        self._active = 0
+        self._released = asyncio.Event()
+
+    def estimate_mb(self, pdf_size: int) -> float:
+        # Parsed PDF objects plus extracted text run a few times the file size
+        return self.job_overhead_mb + 3 * pdf_size / (1024 * 1024)
+
+    def over_budget(self) -> bool:
+        return current_rss_mb() >= self.budget_mb
+
+    @asynccontextmanager
+    async def reserve(self, estimate_mb: float):
+        while self._active and current_rss_mb() + estimate_mb > self.budget_mb:
+            self._released.clear()
+            try:
+                # RSS also drops without a release (GC), so re-check periodically
+                await asyncio.wait_for(self._released.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._released.set()
+
+
+memory_budget = MemoryBudget(
+    settings.LOW_MEMORY_BUDGET_MB,
+    settings.LOW_MEMORY_JOB_OVERHEAD_MB,
+) if settings.LOW_MEMORY_MODE else None
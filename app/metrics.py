@@ -0,0 +1,184 @@
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+# Seconds; audits run from well under a second (cache hits) to several minutes (500-page contracts)
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+LOOP_BUCKETS = (0, 1, 2, 3)
+
+# Per-job trace (a list of span records) and the graph node currently running
+_trace: contextvars.ContextVar[Optional[List[Dict[str, Any]]]] = contextvars.ContextVar("audit_trace", default=None)
+_stage: contextvars.ContextVar[str] = contextvars.ContextVar("audit_stage", default="none")
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, values)} {total}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        # label values -> (cumulative-ready bucket counts, sum, count)
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            series = self._series.setdefault(label_values, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, le)} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {round(total, 6)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {count}")
+        return lines
+
+
+stage_seconds = Histogram("audit_stage_duration_seconds", "Time spent in PDF extraction and each graph node.", ("stage",))
+llm_seconds = Histogram("audit_llm_request_duration_seconds", "Latency of LLM calls, including retries and rate-limit waits.", ("provider", "model", "stage"))
+llm_tokens = Counter("audit_llm_tokens_total", "Tokens reported by the provider.", ("provider", "model", "kind"))
+llm_retries = Counter("audit_llm_retries_total", "LLM calls retried after a rate-limit response.", ("provider",))
+llm_errors = Counter("audit_llm_errors_total", "LLM calls that failed after all retries.", ("provider",))
+llm_hedges = Counter("audit_llm_hedges_total", "Duplicate calls sent because the provider was slower than its p95.", ("provider",))
+llm_failovers = Counter("audit_llm_failovers_total", "Calls retried on the next provider after this one failed.", ("provider",))
+llm_cooldowns = Counter("audit_llm_cooldowns_total", "Times the provider was taken out of rotation for failing.", ("provider",))
+parse_failures = Counter("audit_llm_parse_failures_total", "LLM responses that could not be parsed.", ("agent",))
+pdf_chars_removed = Counter("audit_pdf_chars_removed_total", "Characters of headers, footers, page numbers and layout whitespace removed from PDF text.")
+critic_rule_checks = Counter("audit_critic_rule_checks_total", "Rule-based critic outcomes: passed (LLM skipped) or flagged.", ("outcome",))
+critic_loops = Histogram("audit_critic_loops", "Critic passes per completed audit.", (), LOOP_BUCKETS)
+jobs_finished = Counter("audit_jobs_finished_total", "Audit jobs by final status.", ("status",))
+
+REGISTRY = [
+    stage_seconds, llm_seconds, llm_tokens, llm_retries, llm_errors, llm_hedges, llm_failovers, llm_cooldowns, parse_failures,
+    pdf_chars_removed, critic_rule_checks, critic_loops, jobs_finished,
+]
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition format. Each gunicorn worker reports its own series."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def start_trace() -> List[Dict[str, Any]]:
+    """Starts collecting spans for the current job; tasks spawned afterwards share the list."""
+    trace: List[Dict[str, Any]] = []
+    _trace.set(trace)
+    return trace
+
+
+def _record(span: Dict[str, Any]) -> None:
+    trace = _trace.get()
+    if trace is not None:
+        trace.append(span)
+
+
+def current_stage() -> str:
+    """The pipeline stage (graph node or span) the caller is running in."""
+    return _stage.get()
+
+
+@contextmanager
+def span(stage: str):
+    """Times a pipeline stage into the stage histogram and the current job trace."""
+    token = _stage.set(stage)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _stage.reset(token)
+        stage_seconds.observe(elapsed, stage)
+        _record({"span": stage, "seconds": round(elapsed, 4)})
+
+
+def timed_node(name: str, node):
+    """Wraps a graph node so each run is recorded as a span."""
+    if inspect.iscoroutinefunction(node):
+        @functools.wraps(node)
+        async def run(state):
+            with span(name):
+                return await node(state)
+    else:
+        @functools.wraps(node)
+        def run(state):
+            with span(name):
+                return node(state)
+    return run
+
+
+def record_llm_call(provider: str, model: str, seconds: float, usage: Optional[dict], retries: int, failed: bool = False) -> None:
+    stage = current_stage()
+    llm_seconds.observe(seconds, provider, model, stage)
+    if retries:
+        llm_retries.inc(provider, amount=retries)
+    if failed:
+        llm_errors.inc(provider)
+    usage = usage or {}
+    prompt_tokens = usage.get("input_tokens", 0)
+    completion_tokens = usage.get("output_tokens", 0)
+    if prompt_tokens:
+        llm_tokens.inc(provider, model, "prompt", amount=prompt_tokens)
+    if completion_tokens:
+        llm_tokens.inc(provider, model, "completion", amount=completion_tokens)
+    _record({
+        "span": "llm_call",
+        "stage": stage,
+        "provider": provider,
+        "model": model,
+        "seconds": round(seconds, 4),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "retries": retries,
+        "failed": failed,
+    })
+
+
+def record_parse_failure(agent: str) -> None:
+    parse_failures.inc(agent)
+    _record({"span": "parse_failure", "agent": agent})
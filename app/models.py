@@ -1,15 +1,22 @@
 from typing import List, Dict, Any, Optional
-from typing_extensions import TypedDict
+from typing_extensions import Annotated, TypedDict
 from pydantic import BaseModel, Field
 
 # --- LangGraph State Schema ---
 
-class ExtractedClause(TypedDict):
+def merge_findings(left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Reducer for per-category audit results written by parallel fan-out nodes."""
+    return {**(left or {}), **(right or {})}
+
+class ExtractedClause(TypedDict, total=False):
     type: str
     text: str
     section: Optional[str]
+    offset: Optional[int]  # character offset of the clause in document_text
+    page: Optional[int]  # 1-based page the clause starts on
 
-class Risk(TypedDict):
+class Risk(TypedDict, total=False):
+    clause_id: Optional[int]  # index into ContractState.clauses
     clause_type: str
     risk_level: str  # High, Medium, Low
     issue: str
@@ -20,18 +27,29 @@ class Risk(TypedDict):
 class ContractState(TypedDict):
     # Inputs
     document_text: str
+    page_offsets: List[int]  # character offset where each PDF page starts
+    # Revision audits: the previous version's clauses and findings (empty for a fresh audit)
+    previous_clauses: List[ExtractedClause]
+    previous_risks: List[Risk]
+    previous_sections: List[Dict[str, Any]]  # section hashes and ranges of the previous version
     
     # intermediate outputs
     clauses: List[ExtractedClause]
+    prefetched_risks: Dict[str, List[Risk]]  # first-pass findings audited while extraction streamed
+    category_findings: Annotated[Dict[str, List[Risk]], merge_findings]  # first-pass findings per category (fan-out)
     risks: List[Risk]
     risk_score: int  # 0-100
+    sections: List[Dict[str, Any]]  # hash and character range of each section of this version
     
     # Critic loop state
     critic_approved: bool
     critic_feedback: Optional[str]
+    rejected_risks: List[int]  # indices into risks the critic rejected
+    recheck_clauses: List[int]  # indices into clauses with a missed risk
     loop_count: int
     
     # Final output
+    revision: Optional[Dict[str, Any]]  # clause-level diff against the previous version
     report: str
 
 # --- API Models ---
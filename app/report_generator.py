@@ -1,5 +1,41 @@
 from datetime import datetime
-from app.models import ContractState
+from typing import Any, Dict, List
+from app.models import ContractState, ExtractedClause, Risk
+
+def _clause_label(clause: Dict[str, Any]) -> str:
+    return f"{clause.get('type') or 'Clause'}" + (f" ({clause['section']})" if clause.get('section') else "")
+
+def _levels(levels: List[str]) -> str:
+    return ", ".join(levels) if levels else "no findings"
+
+def _revision_section(revision: Dict[str, Any], clauses: List[ExtractedClause], risks: List[Risk], previous_risks: List[Risk], risk_score: int) -> str:
+    """What changed since the previous version: clause edits, additions and removals, and the findings on them."""
+    from app.agents.auditor import compute_risk_score
+    from app.agents.playbook import playbook_registry
+    previous_score = compute_risk_score(previous_risks, playbook_registry.get().weights)
+    levels_now: Dict[int, List[str]] = {}
+    for risk in risks:
+        if isinstance(risk.get('clause_id'), int):
+            levels_now.setdefault(risk['clause_id'], []).append(risk.get('risk_level', 'UNKNOWN'))
+    
+    section = f"""## Changes Since Previous Version
+
+**Risk Score: {previous_score} → {risk_score}/100** · {len(revision['modified'])} modified, {len(revision['added'])} added, {len(revision['removed'])} removed, {len(revision['unchanged'])} unchanged clauses (findings carried forward)
+
+"""
+    if not (revision['modified'] or revision['added'] or revision['removed']):
+        section += "No clause changes detected.\n\n"
+    for change in revision['modified']:
+        section += f"### ✏️ Modified: {_clause_label(clauses[change['id']])}\n"
+        section += f"*Findings: {_levels(change['previous_risks'])} → {_levels(levels_now.get(change['id'], []))}*\n\n"
+        section += f"{change['diff']}\n\n"
+    for clause_id in revision['added']:
+        section += f"### ➕ Added: {_clause_label(clauses[clause_id])}\n"
+        section += f"*Findings: {_levels(levels_now.get(clause_id, []))}*\n\n"
+    for clause in revision['removed']:
+        section += f"### ➖ Removed: {_clause_label(clause)}\n"
+        section += f"*Previous findings: {_levels(clause['previous_risks'])}*\n\n"
+    return section + "---\n\n"
 
 def generate_markdown_report(state: ContractState) -> str:
     """Generates a professional Markdown report from the audit state."""
@@ -27,23 +63,35 @@ This report highlights potential legal risks found in the provided contract. Our
 
 ---
 
-## 2. Risk Breakdown
-
 """
+    revision = state.get("revision")
+    changed = set()
+    if revision:
+        report += _revision_section(revision, clauses, risks, state.get("previous_risks") or [], risk_score)
+        changed = {c['id'] for c in revision['modified']} | set(revision['added'])
+
+    report += "## 2. Risk Breakdown\n\n"
 
     if not risks:
         report += "✅ No significant risks identified in the analyzed clauses.\n\n"
     else:
         for i, risk in enumerate(risks, 1):
-            level_emoji = "🔴" if risk['risk_level'] == "High" else "🟡" if risk['risk_level'] == "Medium" else "🟢"
+            risk_level = risk.get('risk_level', 'UNKNOWN')
+            level_emoji = "🔴" if risk_level == "High" else "🟡" if risk_level == "Medium" else "🟢"
+            
+            # On a revision, flag findings on clauses that changed in this version
+            marker = " · ✏️ Changed clause" if risk.get('clause_id') in changed else ""
+            report += f"### {i}. {risk.get('clause_type', 'Clause')} ({level_emoji} {risk_level} Risk{marker})\n"
             
-            report += f"### {i}. {risk['clause_type']} ({level_emoji} {risk['risk_level']} Risk)\n"
-            report += f"**Issue:** {risk['issue']}\n\n"
+            clause_id = risk.get('clause_id')
+            if isinstance(clause_id, int) and 0 <= clause_id < len(clauses) and clauses[clause_id].get('page'):
+                report += f"*Source: page {clauses[clause_id]['page']}*\n\n"
+            report += f"**Issue:** {risk.get('issue', '')}\n\n"
             
             if risk.get('toxic_language'):
                 report += f"> [!CAUTION]\n> **Toxic Language Identified:**\n> \"{risk['toxic_language']}\"\n\n"
                 
-            report += f"**Recommendation:** {risk['recommendation']}\n\n"
+            report += f"**Recommendation:** {risk.get('recommendation', '')}\n\n"
             
             if risk.get('suggested_alternative'):
                 report += f"#### Proposed Alternative Clause:\n"
@@ -53,7 +101,12 @@ This report highlights potential legal risks found in the provided contract. Our
 
     report += "## 3. Analyzed Clauses\n"
     for clause in clauses:
-        section_info = f" (Section: {clause['section']})" if clause.get('section') else ""
+        location = []
+        if clause.get('section'):
+            location.append(f"Section: {clause['section']}")
+        if clause.get('page'):
+            location.append(f"Page {clause['page']}")
+        section_info = f" ({', '.join(location)})" if location else ""
         report += f"### {clause['type']}{section_info}\n"
         report += f"```text\n{clause['text']}\n```\n\n"
 
@@ -0,0 +1,105 @@
+import asyncio
+import itertools
+import time
+from typing import Awaitable, Callable, Dict, List, Tuple
+from app.config import settings
+
+# Lower value runs first
+PRIORITIES = {"interactive": 0, "bulk": 1}
+
+
+class QueueFullError(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Audit queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AuditScheduler:
+    """
+    Bounded in-process scheduler for audit pipelines.
+    A fixed pool of workers drains a priority queue; each provider additionally
+    caps how many of its jobs run at once, and submissions beyond max_queue are refused.
+    """
+
+    def __init__(self, workers: int, max_queue: int, provider_limits: Dict[str, int]):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._provider_limits = provider_limits
+        self._provider_slots: Dict[str, asyncio.Semaphore] = {}
+        self._queue: "asyncio.PriorityQueue[Tuple[int, int, str, str, Callable[[], Awaitable]]]" = asyncio.PriorityQueue()
+        self._order = itertools.count()
+        self._queued_ids: set = set()
+        self._dropped: set = set()
+        self._workers: List[asyncio.Task] = []
+        self._room = asyncio.Event()
+        # Rolling average job duration, used to suggest a Retry-After
+        self._avg_duration = 30.0
+
+    def start(self) -> None:
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    @property
+    def queued(self) -> int:
+        return len(self._queued_ids) - len(self._dropped)
+
+    def retry_after(self) -> int:
+        """Rough seconds until a queue slot frees up."""
+        return max(1, round(self._avg_duration * max(self.queued, 1) / self.workers))
+
+    def submit(self, job_id: str, run: Callable[[], Awaitable], provider: str, priority: str = "interactive") -> None:
+        if self.queued >= self.max_queue:
+            raise QueueFullError(self.retry_after())
+        self._queued_ids.add(job_id)
+        self._queue.put_nowait((PRIORITIES.get(priority, PRIORITIES["bulk"]), next(self._order), job_id, provider, run))
+
+    async def submit_when_ready(self, job_id: str, run: Callable[[], Awaitable], provider: str, priority: str = "bulk") -> None:
+        """Like submit, but waits for queue room instead of refusing (for batch feeders)."""
+        # Leave a quarter of the queue free so interactive uploads aren't refused during a batch
+        limit = max(1, self.max_queue - self.max_queue // 4)
+        while self.queued >= limit:
+            self._room.clear()
+            await self._room.wait()
+        self.submit(job_id, run, provider, priority)
+
+    def drop(self, job_id: str) -> None:
+        """Forgets a job that hasn't started yet; running jobs stop cooperatively."""
+        if job_id in self._queued_ids:
+            self._dropped.add(job_id)
+
+    def _slots(self, provider: str) -> asyncio.Semaphore:
+        if provider not in self._provider_slots:
+            self._provider_slots[provider] = asyncio.Semaphore(self._provider_limits.get(provider, self.workers))
+        return self._provider_slots[provider]
+
+    async def _work(self) -> None:
+        while True:
+            _, _, job_id, provider, run = await self._queue.get()
+            self._queued_ids.discard(job_id)
+            self._room.set()
+            try:
+                if job_id in self._dropped:
+                    self._dropped.discard(job_id)
+                    continue
+                async with self._slots(provider):
+                    started = time.monotonic()
+                    try:
+                        await run()
+                    except Exception as e:
+                        print(f"Scheduled job {job_id} failed: {e}")
+                    self._avg_duration = 0.8 * self._avg_duration + 0.2 * (time.monotonic() - started)
+            finally:
+                self._queue.task_done()
+
+
+scheduler = AuditScheduler(
+    settings.SCHEDULER_WORKERS,
+    settings.SCHEDULER_MAX_QUEUE,
+    settings.PROVIDER_MAX_CONCURRENT_JOBS,
+)
@@ -0,0 +1,75 @@
+# Cold-start timing. With STARTUP_REPORT=1 in the environment, imports are timed
+# per top-level package and a breakdown is printed once the service is warm.
+# The flag is read from the environment directly: it has to be known before
+# app.config (and pydantic) are imported.
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+STARTED = time.perf_counter()
+ENABLED = os.environ.get("STARTUP_REPORT", "").lower() in ("1", "true", "yes")
+
+_phases: List[Tuple[str, float]] = []
+_import_self_time: Dict[str, float] = defaultdict(float)
+_stack: List[float] = []  # child time accumulated by each import in progress
+
+
+class _TimedLoader:
+    def __init__(self, loader, name: str):
+        self._loader = loader
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        _stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - started
+            children = _stack.pop()
+            _import_self_time[self._name.split(".")[0]] += elapsed - children
+            if _stack:
+                _stack[-1] += elapsed
+
+
+class _TimingFinder:
+    """Wraps every other finder's loader so module execution is timed (like -X importtime, aggregated)."""
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, name)
+                return spec
+        return None
+
+
+if ENABLED:
+    sys.meta_path.insert(0, _TimingFinder())
+
+
+def mark(phase: str) -> None:
+    """Records that `phase` finished, timed from process start."""
+    _phases.append((phase, time.perf_counter() - STARTED))
+
+
+def report(top: int = 15) -> None:
+    if not ENABLED:
+        return
+    print("Startup report (seconds since app import):")
+    for phase, at in _phases:
+        print(f"  {phase:<28} {at:8.3f}")
+    print(f"Slowest imports by package (self time, total {sum(_import_self_time.values()):.3f}s):")
+    for package, seconds in sorted(_import_self_time.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {package:<28} {seconds:8.3f}")
@@ -0,0 +1,108 @@
+import re
+from collections import defaultdict
+from typing import List, NamedTuple, Optional, Tuple
+
+# Fraction of the page height at the top and bottom treated as header/footer margins
+MARGIN = 0.1
+# Margin text repeated on at least this share of pages is a running header/footer
+REPEAT_SHARE = 0.5
+
+# A line that has to stay on its own line: a section heading or a list item
+_LINE_START = re.compile(
+    r"^(?:(?:ARTICLE|Article|SECTION|Section|CLAUSE|Clause|SCHEDULE|Schedule|EXHIBIT|Exhibit)\s+[\dIVXLC]+"
+    r"|\d+(?:\.\d+)*[.)]?\s+[A-Z]"
+    r"|\(?[a-z0-9ivx]{1,4}\)\s"
+    r"|[•\-–*]\s"
+    r"|[A-Z][A-Z \-&,]{3,60}$)"
+)
+_PAGE_NUMBER = re.compile(r"^(?:page\s*)?[-–\s]*\d+(?:\s*(?:of|/)\s*\d+)?[-–\s]*$", re.IGNORECASE)
+_SENTENCE_END = re.compile(r"[.:;!?)\]\"”]$")
+
+
+class PageBlocks(NamedTuple):
+    height: float
+    blocks: List[Tuple[float, float, str]]  # (top, bottom, text) per text block, in reading order
+
+
+def page_blocks(page) -> PageBlocks:
+    """The text blocks of a PyMuPDF page with their vertical position; image blocks are dropped."""
+    blocks = [(b[1], b[3], b[4]) for b in page.get_text("blocks") if b[6] == 0 and b[4].strip()]
+    return PageBlocks(page.rect.height or 1.0, blocks)
+
+
+def _band(page: PageBlocks, top: float, bottom: float) -> Optional[str]:
+    """The margin a block sits in, "header" or "footer", or None for body text."""
+    middle = (top + bottom) / 2 / page.height
+    if middle < MARGIN:
+        return "header"
+    if middle > 1 - MARGIN:
+        return "footer"
+    return None
+
+
+def _repeat_key(text: str) -> str:
+    """Block text with whitespace collapsed and numbers masked, so "Page 3 of 9" matches "Page 4 of 9"."""
+    return re.sub(r"\d+", "#", " ".join(text.lower().split()))
+
+
+def _join_lines(text: str) -> str:
+    """
+    Rejoins the wrapped lines of one block into paragraphs: hyphenated breaks are
+    closed up, headings and list items keep their own lines, whitespace is collapsed.
+    """
+    lines = [" ".join(line.split()) for line in text.splitlines()]
+    lines = [line for line in lines if line]
+    out = lines[:1]
+    for line in lines[1:]:
+        prev = out[-1]
+        if _LINE_START.match(line) or (_LINE_START.match(prev) and len(prev) < 80 and not _SENTENCE_END.search(prev)):
+            out.append(line)
+        elif prev.endswith("-") and prev[-2:-1].isalpha() and line[:1].islower():
+            out[-1] = prev[:-1] + line
+        else:
+            out[-1] = f"{prev} {line}"
+    return "\n".join(out)
+
+
+def normalize_pages(pages: List[PageBlocks]) -> Tuple[List[str], int]:
+    """
+    Page texts with running headers/footers, page numbers and layout line breaks removed,
+    plus the character count of the raw text, for reporting what was saved.
+    Header/footer margin text is stripped when it repeats (numbers aside) in the same
+    margin on at least REPEAT_SHARE of the pages, and a lone number there is dropped as
+    a page number. Body text is never stripped, however often a paragraph recurs.
+    """
+    raw_chars = sum(len(text) for page in pages for _, _, text in page.blocks)
+    seen = defaultdict(set)
+    for number, page in enumerate(pages):
+        for top, bottom, text in page.blocks:
+            band = _band(page, top, bottom)
+            if band:
+                seen[(band, _repeat_key(text))].add(number)
+    threshold = max(2, REPEAT_SHARE * len(pages))
+    repeated = {key for key, on in seen.items() if len(on) >= threshold}
+
+    texts = []
+    for page in pages:
+        kept = []
+        for top, bottom, text in page.blocks:
+            band = _band(page, top, bottom)
+            if band and ((band, _repeat_key(text)) in repeated or _PAGE_NUMBER.match(text.strip())):
+                continue
+            kept.append(_join_lines(text))
+        texts.append("\n".join(kept))
+
+    # A paragraph running on over a page break continues on the same line
+    for i in range(len(texts) - 1):
+        if not texts[i]:
+            continue
+        following = texts[i + 1][:1]
+        if texts[i].endswith("-") and texts[i][-2:-1].isalpha() and following.islower():
+            texts[i] = texts[i][:-1]
+        elif following.islower() and not _SENTENCE_END.search(texts[i]):
+            texts[i] += " "
+        else:
+            texts[i] += "\n"
+    if texts and texts[-1]:
+        texts[-1] += "\n"
+    return texts, raw_chars
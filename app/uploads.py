@@ -0,0 +1,99 @@
+import hashlib
+import os
+import tempfile
+import time
+import zipfile
+from typing import Tuple
+from fastapi import UploadFile
+from app.config import settings
+
+CHUNK_BYTES = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def _spool_dir() -> str:
+    os.makedirs(settings.UPLOAD_SPOOL_DIR, exist_ok=True)
+    return settings.UPLOAD_SPOOL_DIR
+
+
+class _Spool:
+    """A temp file in the spool dir that hashes what is written and refuses to grow past max_bytes."""
+
+    def __init__(self, max_bytes: int, label: str, suffix: str):
+        self.max_bytes = max_bytes
+        self.label = label
+        self.digest = hashlib.sha256()
+        self.size = 0
+        fd, self.path = tempfile.mkstemp(suffix=suffix, dir=_spool_dir())
+        self.out = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(f"{self.label} exceeds {self.max_bytes // (1024 * 1024)} MB")
+        self.digest.update(chunk)
+        self.out.write(chunk)
+
+    def close(self) -> Tuple[str, str]:
+        self.out.close()
+        return self.path, self.digest.hexdigest()
+
+    def abort(self) -> None:
+        self.out.close()
+        discard(self.path)
+
+
+async def spool_upload(file: UploadFile, max_bytes: int, suffix: str = ".pdf") -> Tuple[str, str]:
+    """
+    Streams an upload to a temp file in 1 MiB chunks, never holding it in memory.
+    Returns (path, sha256 hex digest); raises UploadTooLarge past max_bytes.
+    """
+    spool = _Spool(max_bytes, "Upload", suffix)
+    try:
+        while chunk := await file.read(CHUNK_BYTES):
+            spool.write(chunk)
+    except BaseException:
+        spool.abort()
+        raise
+    return spool.close()
+
+
+def spool_zip_member(archive: zipfile.ZipFile, member: zipfile.ZipInfo, max_bytes: int) -> Tuple[str, str]:
+    """
+    Decompresses one zip member to the spool in chunks, like spool_upload.
+    The size is checked as it inflates, since a member's declared size can't be trusted.
+    """
+    label = os.path.basename(member.filename)
+    if member.file_size > max_bytes:
+        raise UploadTooLarge(f"{label} exceeds {max_bytes // (1024 * 1024)} MB")
+    spool = _Spool(max_bytes, label, ".pdf")
+    try:
+        with archive.open(member) as source:
+            while chunk := source.read(CHUNK_BYTES):
+                spool.write(chunk)
+    except BaseException:
+        spool.abort()
+        raise
+    return spool.close()
+
+
+def discard(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def sweep_spool(max_age: float) -> int:
+    """Removes spooled files older than max_age seconds, e.g. left by a crashed worker."""
+    cutoff = time.time() - max_age
+    removed = 0
+    for name in os.listdir(_spool_dir()):
+        path = os.path.join(settings.UPLOAD_SPOOL_DIR, name)
+        if os.path.getmtime(path) < cutoff:
+            discard(path)
+            removed += 1
+    return removed
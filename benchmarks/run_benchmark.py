@@ -0,0 +1,210 @@
+"""
+Offline benchmark for the audit service, using the fake LLM provider.
+
+    python -m benchmarks.run_benchmark --mode pipeline --documents 20 --pages 1,20,100 --concurrency 4
+    python -m benchmarks.run_benchmark --mode http --documents 20 --pages 10 --latency-ms 300
+    python -m benchmarks.run_benchmark --mode http --url http://localhost:8080 --documents 5
+
+"pipeline" drives run_audit_pipeline directly and reports per-node latency;
+"http" drives POST /audit + /status end to end, in-process unless --url is given.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import resource
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+
+def _configure(args: argparse.Namespace) -> None:
+    """Settings are read at import time, so this must run before any app module is imported."""
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["FAKE_LLM_JITTER_MS"] = str(args.jitter_ms)
+    os.environ["FAKE_LLM_ERROR_RATE"] = str(args.error_rate)
+    os.environ["SCHEDULER_MAX_QUEUE"] = str(max(args.documents, 20))
+    # Keys in .env must never pull real providers into an offline run
+    os.environ["LLM_ROUTING"] = "true" if args.routing else "false"
+    if not args.with_caches:
+        os.environ["RESULT_CACHE_ENABLED"] = "false"
+        os.environ["CLAUSE_CACHE_ENABLED"] = "false"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux; children covers the PDF extraction pool
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round((own + children) / 1024, 1)
+
+
+def make_documents(count: int, page_sizes: List[int]) -> List[bytes]:
+    from benchmarks.synthetic_contracts import generate_contract_pdf
+    return [generate_contract_pdf(page_sizes[i % len(page_sizes)], seed=i) for i in range(count)]
+
+
+def _node_timer():
+    """Callback handler recording the wall time of each graph node."""
+    from langchain_core.callbacks import AsyncCallbackHandler
+
+    class NodeTimer(AsyncCallbackHandler):
+        def __init__(self):
+            self.started: Dict[UUID, tuple] = {}
+            self.durations: Dict[str, List[float]] = defaultdict(list)
+            self.graph_started: Dict[UUID, float] = {}
+
+        async def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+            name = kwargs.get("name")
+            if parent_run_id is None:
+                self.graph_started[run_id] = time.perf_counter()
+            # Node runs are the ones named after the node they belong to
+            elif metadata and name == metadata.get("langgraph_node"):
+                self.started[run_id] = (name, time.perf_counter())
+
+        async def on_chain_end(self, outputs, *, run_id, **kwargs):
+            if run_id in self.started:
+                name, started = self.started.pop(run_id)
+                self.durations[name].append(time.perf_counter() - started)
+
+    return NodeTimer()
+
+
+async def run_pipeline_mode(docs: List[bytes], concurrency: int) -> Dict[str, Any]:
+    from app.main import create_audit_job, run_audit_pipeline, jobs
+
+    timer = _node_timer()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, pdf_times, failures = [], [], 0
+
+    async def audit(content: bytes):
+        nonlocal failures
+        async with semaphore:
+            job_id, cache_key, _ = create_audit_job(hashlib.sha256(content).hexdigest())
+            started = time.perf_counter()
+            graph_runs_before = set(timer.graph_started)
+            await run_audit_pipeline(job_id, content, cache_key, config={"callbacks": [timer]})
+            latencies.append(time.perf_counter() - started)
+            # PDF extraction is everything before the graph run started
+            new_runs = [t for r, t in timer.graph_started.items() if r not in graph_runs_before]
+            if new_runs:
+                pdf_times.append(min(new_runs) - started)
+            if jobs.get(job_id)["status"] != "COMPLETED":
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(audit(doc) for doc in docs))
+    elapsed = time.perf_counter() - started
+
+    nodes = {"pdf_extraction": pdf_times, **timer.durations}
+    return {"elapsed": elapsed, "latencies": latencies, "failures": failures, "nodes": nodes}
+
+
+async def run_http_mode(docs: List[bytes], concurrency: int, url: Optional[str]) -> Dict[str, Any]:
+    import httpx
+
+    async def audit(client: httpx.AsyncClient, content: bytes) -> bool:
+        started = time.perf_counter()
+        while True:
+            response = await client.post("/audit", params={"priority": "bulk"}, files={"file": ("contract.pdf", content, "application/pdf")})
+            if response.status_code != 429:
+                break
+            await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+        response.raise_for_status()
+        job_id = response.json()["job_id"]
+        status = None
+        async with client.stream("GET", f"/status/{job_id}") as stream:
+            async for line in stream.aiter_lines():
+                if line.startswith("data:"):
+                    status = json.loads(line[5:])["status"]
+        latencies.append(time.perf_counter() - started)
+        return status == "COMPLETED"
+
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(client, content):
+        async with semaphore:
+            return await audit(client, content)
+
+    async def drive(client):
+        started = time.perf_counter()
+        ok = await asyncio.gather(*(bounded(client, doc) for doc in docs))
+        return time.perf_counter() - started, ok
+
+    if url:
+        async with httpx.AsyncClient(base_url=url, timeout=None) as client:
+            elapsed, ok = await drive(client)
+    else:
+        from app.main import app
+        # Run the app's lifespan so the graph is compiled and the scheduler is started
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                elapsed, ok = await drive(client)
+    return {"elapsed": elapsed, "latencies": latencies, "failures": ok.count(False), "nodes": {}}
+
+
+def report(mode: str, results: Dict[str, Any], documents: int) -> Dict[str, Any]:
+    summary = {
+        "mode": mode,
+        "documents": documents,
+        "failures": results["failures"],
+        "elapsed_s": round(results["elapsed"], 3),
+        "throughput_docs_per_s": round(documents / results["elapsed"], 3) if results["elapsed"] else None,
+        "latency_s": {f"p{p}": round(percentile(results["latencies"], p), 3) for p in (50, 95, 99)},
+        "nodes_s": {
+            name: {f"p{p}": round(percentile(values, p), 4) for p in (50, 95, 99)} | {"count": len(values)}
+            for name, values in results["nodes"].items()
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    print(f"\n{mode} benchmark: {documents} documents, {summary['failures']} failed")
+    print(f"  throughput   {summary['throughput_docs_per_s']} docs/s over {summary['elapsed_s']}s")
+    print(f"  job latency  " + "  ".join(f"{k}={v}s" for k, v in summary["latency_s"].items()))
+    for name, stats in summary["nodes_s"].items():
+        print(f"  {name:<16} " + "  ".join(f"{k}={v}" for k, v in stats.items()))
+    print(f"  peak RSS     {summary['peak_rss_mb']} MB")
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline audit benchmark with the fake LLM provider")
+    parser.add_argument("--mode", choices=["pipeline", "http"], default="pipeline")
+    parser.add_argument("--documents", type=int, default=10)
+    parser.add_argument("--pages", default="1,10,50", help="comma-separated page counts, cycled across documents")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--routing", action="store_true", help="route calls through the provider router (still fake-only)")
+    parser.add_argument("--with-caches", action="store_true", help="keep the result and clause caches enabled")
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app (http mode)")
+    parser.add_argument("--json", dest="json_path", help="also write the summary to this file")
+    args = parser.parse_args()
+    _configure(args)
+
+    docs = make_documents(args.documents, [int(p) for p in args.pages.split(",")])
+    if args.mode == "pipeline":
+        results = asyncio.run(run_pipeline_mode(docs, args.concurrency))
+    else:
+        results = asyncio.run(run_http_mode(docs, args.concurrency, args.url))
+    summary = report(args.mode, results, len(docs))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
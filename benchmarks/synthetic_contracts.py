@@ -0,0 +1,109 @@
+"""
+Synthetic contract PDFs for offline benchmarks.
+
+    python -m benchmarks.synthetic_contracts --pages 50 --out contract.pdf
+"""
+import argparse
+import random
+from typing import List, Tuple
+import fitz  # PyMuPDF
+
+PAGE_CHARS = 2800
+
+# (heading, balanced text, toxic text) per playbook category
+CLAUSES: List[Tuple[str, str, str]] = [
+    (
+        "Indemnification",
+        "The Supplier shall indemnify the Customer for direct damages arising from the Supplier's gross negligence or willful misconduct, capped at the total contract value.",
+        "The Supplier shall indemnify for any and all claims, losses and expenses of whatever nature, including those arising from the Customer's sole negligence, and such unlimited indemnity shall survive termination.",
+    ),
+    (
+        "Termination",
+        "Either party may terminate this Agreement for convenience upon thirty (30) days written notice. Prepaid fees for services not yet rendered shall be refunded on a pro-rata basis.",
+        "The Customer may exercise immediate termination for any reason, and all amounts paid are non-refundable fees upon termination regardless of the services delivered.",
+    ),
+    (
+        "Governing Law",
+        "This Agreement shall be governed by and construed in accordance with the laws of the State of Delaware, without regard to its conflict of laws principles.",
+        "This Agreement is subject to the exclusive jurisdiction of the courts of a foreign territory, with arbitration in inconvenient locations chosen solely by the Customer.",
+    ),
+    (
+        "Limitation of Liability",
+        "Except for breaches of confidentiality, each party's aggregate liability shall not exceed the fees paid in the twelve (12) months preceding the claim.",
+        "There shall be no limitation of liability for the Supplier, while the Customer's aggregate liability not to exceed $0 for any claim.",
+    ),
+    (
+        "Intellectual Property",
+        "Each party retains ownership of its pre-existing intellectual property. Deliverables created specifically for the Customer are licensed on a non-exclusive basis.",
+        "The Supplier agrees to the transfer of all IP ownership and grants a perpetual, irrevocable, royalty-free license to all data, as work made for hire without limitations.",
+    ),
+]
+
+FILLER_TOPICS = [
+    "Delivery", "Acceptance", "Pricing", "Invoicing", "Service Levels", "Personnel",
+    "Reporting", "Audit Rights", "Insurance", "Notices", "Assignment", "Force Majeure",
+]
+
+FILLER_SENTENCES = [
+    "The Supplier shall perform the Services in a professional and workmanlike manner consistent with industry standards.",
+    "All invoices shall be payable within forty-five (45) days of receipt of a correct and undisputed invoice.",
+    "The parties shall meet quarterly to review performance against the agreed service levels and reporting obligations.",
+    "Any change to the scope of the Services shall be documented in a written change order signed by both parties.",
+    "The Supplier shall maintain accurate records relating to the Services for a period of three (3) years.",
+    "Notices under this Agreement shall be in writing and delivered by hand, courier or registered mail.",
+    "Neither party shall be liable for delays caused by events beyond its reasonable control, provided it gives prompt notice.",
+]
+
+
+def contract_text(pages: int, seed: int = 0, toxic_ratio: float = 0.5) -> List[str]:
+    """Returns the text of each page of a numbered-section services agreement."""
+    rng = random.Random(seed)
+    # Each key clause lands on a random page, as in real agreements
+    placements = {}
+    for heading, fair, toxic in CLAUSES:
+        text = toxic if rng.random() < toxic_ratio else fair
+        placements.setdefault(rng.randrange(pages), []).append((heading, text))
+
+    page_texts, number = [], 1
+    for page in range(pages):
+        current = ""
+        sections = list(placements.get(page, []))
+        rng.shuffle(sections)
+        while True:
+            if sections:
+                heading, text = sections.pop()
+            else:
+                heading = rng.choice(FILLER_TOPICS)
+                text = " ".join(rng.choice(FILLER_SENTENCES) for _ in range(rng.randint(4, 9)))
+            block = f"{number}. {heading}\n{text}\n\n"
+            if len(current) + len(block) > PAGE_CHARS and current and not sections:
+                break
+            current += block
+            number += 1
+        page_texts.append(current)
+    return page_texts
+
+
+def generate_contract_pdf(pages: int, seed: int = 0, toxic_ratio: float = 0.5) -> bytes:
+    """Renders a synthetic contract of exactly `pages` pages, with a running header and footer."""
+    doc = fitz.open()
+    for number, text in enumerate(contract_text(pages, seed, toxic_ratio), 1):
+        page = doc.new_page()
+        page.insert_text((72, 40), "CONFIDENTIAL - Master Services Agreement", fontsize=8)
+        page.insert_textbox(fitz.Rect(72, 60, 540, 760), text, fontsize=8)
+        page.insert_text((280, 800), f"Page {number} of {pages}", fontsize=8)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic contract PDF")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--toxic-ratio", type=float, default=0.5)
+    parser.add_argument("--out", default="synthetic_contract.pdf")
+    args = parser.parse_args()
+    with open(args.out, "wb") as f:
+        f.write(generate_contract_pdf(args.pages, args.seed, args.toxic_ratio))
+    print(f"Wrote {args.pages}-page contract to {args.out}")
@@ -1,10 +1,12 @@
 import os
 
 # Gunicorn configuration for Render.com Free Tier
-# Memory limit is 512MB, so we use a single worker
+# Memory limit is 512MB, so we default to a single worker.
+# More workers need a shared job store (JOB_STORE_BACKEND=sqlite) so /status
+# requests can be answered by any worker.
 
 bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
-workers = 1
+workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
 worker_class = "uvicorn.workers.UvicornWorker"
 timeout = 120
 keepalive = 5
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import pytest
+from app.agents import json_stream
+from app.agents.json_stream import ItemStream, JSONItemParser
+
+
+def feed_all(parser: JSONItemParser, text: str, chunk_size: int = 1):
+    items = []
+    for i in range(0, len(text), chunk_size):
+        items += parser.feed(text[i:i + chunk_size])
+    return items
+
+
+def test_items_under_key():
+    parser = JSONItemParser("risks")
+    reply = '{"summary": "x", "risks": [{"a": 1}, {"b": {"c": [2]}}]}'
+    assert [json.loads(item) for item in feed_all(parser, reply)] == [{"a": 1}, {"b": {"c": [2]}}]
+    assert parser.entered and parser.finished
+
+
+def test_empty_array_under_key_is_a_complete_reply():
+    parser = JSONItemParser("risks")
+    assert feed_all(parser, '{"risks": []}') == []
+    assert parser.entered and parser.finished
+
+
+def test_bare_list_does_not_enter_key():
+    parser = JSONItemParser("risks")
+    assert feed_all(parser, '[{"clause_id": 0}, {"clause_id": 1}]') == []
+    assert parser.finished and not parser.entered
+
+
+def test_object_without_key_does_not_enter_key():
+    parser = JSONItemParser("risks")
+    assert feed_all(parser, '{"findings": [{"a": 1}]}') == []
+    assert parser.finished and not parser.entered
+
+
+def test_nested_key_with_same_name_is_ignored():
+    parser = JSONItemParser("risks")
+    assert feed_all(parser, '{"meta": {"risks": [{"a": 1}]}}') == []
+    assert not parser.entered
+
+
+def test_top_level_list_without_key():
+    parser = JSONItemParser()
+    items = feed_all(parser, 'Here you go:\n```json\n[{"type": "A"}, {"type": "B"}]\n```', chunk_size=7)
+    assert [json.loads(item) for item in items] == [{"type": "A"}, {"type": "B"}]
+    assert parser.entered and parser.finished
+
+
+def test_brackets_and_escaped_quotes_inside_strings():
+    parser = JSONItemParser("risks")
+    reply = '{"note": "a ] or } \\" here", "risks": [{"text": "see [1] {x} \\"q\\""}]}'
+    items = feed_all(parser, reply)
+    assert [json.loads(item) for item in items] == [{"text": 'see [1] {x} "q"'}]
+
+
+def test_truncated_reply_leaves_remainder():
+    parser = JSONItemParser("risks")
+    items = feed_all(parser, '{"risks": [{"a": 1}, {"b": "cut')
+    assert len(items) == 1
+    assert parser.remainder() == '{"b": "cut'
+    assert not parser.finished
+
+
+def test_no_json():
+    parser = JSONItemParser("risks")
+    assert feed_all(parser, "I cannot help with that.") == []
+    assert not parser.started and not parser.entered
+
+
+def _stream(reply: str, monkeypatch, key: str = "risks") -> ItemStream:
+    async def fake_astream(chain, inputs):
+        for i in range(0, len(reply), 5):
+            yield reply[i:i + 5]
+
+    monkeypatch.setattr(json_stream, "astream_chain", fake_astream)
+    return ItemStream(None, {}, agent="test", item="a finding", key=key)
+
+
+def _collect(stream: ItemStream):
+    async def run():
+        return [item async for item in stream]
+    return asyncio.run(run())
+
+
+def test_item_stream_complete(monkeypatch):
+    stream = _stream('{"risks": [{"a": 1}]}', monkeypatch)
+    assert _collect(stream) == [{"a": 1}]
+    assert stream.complete
+
+
+def test_item_stream_recovers_bare_list_but_is_not_complete(monkeypatch):
+    stream = _stream('[{"a": 1}, {"b": 2}]', monkeypatch)
+    assert _collect(stream) == [{"a": 1}, {"b": 2}]
+    assert stream.recovered and not stream.complete
+
+
+def test_item_stream_missing_key_is_not_complete(monkeypatch):
+    stream = _stream('{"findings": []}', monkeypatch)
+    with pytest.raises(ValueError):
+        _collect(stream)
+    assert not stream.complete